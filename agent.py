@@ -12,10 +12,18 @@ The template format is a JSON object with fields mapping to metadata, e.g.
 The returned filled form is a dict mapping field names to values.
 Requires GROQ_API_KEY environment variable.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import logging
 import os
-import re
 import json
+import re
+import threading
+import uuid
 
 try:
     from groq import Groq
@@ -24,6 +32,147 @@ except Exception:
     Groq = None
     groq_available = False
 
+logger = logging.getLogger(__name__)
+
+# Optional semantic cache: a prompt whose embedding is within
+# SEMANTIC_CACHE_MAX_DISTANCE (cosine) of an earlier prompt for the same
+# template reuses that fill. Off unless LLM_SEMANTIC_CACHE=1; needs chromadb.
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE") == "1"
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.getenv("LLM_SEMANTIC_CACHE_MAX_DISTANCE", 0.08))
+SEMANTIC_CACHE_DIR = os.getenv("LLM_SEMANTIC_CACHE_DIR", "./chroma_db")
+
+chromadb = None
+if SEMANTIC_CACHE_ENABLED:
+    try:
+        import chromadb
+    except ImportError:
+        logger.warning("LLM_SEMANTIC_CACHE=1 but chromadb is not installed; semantic cache disabled")
+        SEMANTIC_CACHE_ENABLED = False
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# Shared Groq client so the underlying HTTP connection pool is reused
+# across form fills instead of being rebuilt on every call.
+_groq_client = None
+_groq_client_lock = threading.Lock()
+
+
+def _get_groq_client():
+    """Return the process-wide Groq client, creating it on first use."""
+    global _groq_client
+    if _groq_client is None:
+        with _groq_client_lock:
+            if _groq_client is None:
+                _groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _groq_client
+
+
+# Exact-match cache of parsed fill results. Form filling runs at temperature 0,
+# so an identical (model, template, prompt) triple yields the same extraction.
+FILL_TEMPERATURE = 0
+FILL_CACHE_SIZE = int(os.getenv("FILL_CACHE_SIZE", 1024))
+_fill_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_fill_cache_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0}
+
+
+def _fill_cache_key(template: Dict[str, Any], prompt: str, model: str) -> str:
+    """Hash the canonicalized template and prompt into a cache key."""
+    canonical = json.dumps(template, sort_keys=True, default=str)
+    return hashlib.sha256(f"{model}\0{canonical}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def _fill_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    with _fill_cache_lock:
+        cached = _fill_cache.get(key)
+        if cached is None:
+            stats["misses"] += 1
+            return None
+        _fill_cache.move_to_end(key)
+        stats["hits"] += 1
+        return dict(cached)
+
+
+def _fill_cache_put(key: str, value: Dict[str, Any]) -> None:
+    with _fill_cache_lock:
+        _fill_cache[key] = dict(value)
+        _fill_cache.move_to_end(key)
+        while len(_fill_cache) > FILL_CACHE_SIZE:
+            _fill_cache.popitem(last=False)
+
+
+_semantic_client = None
+_semantic_client_lock = threading.Lock()
+
+
+def _semantic_collection(template: Dict[str, Any], model: str):
+    """Return the Chroma collection holding cached fills for this template."""
+    global _semantic_client
+    if _semantic_client is None:
+        with _semantic_client_lock:
+            if _semantic_client is None:
+                _semantic_client = chromadb.PersistentClient(path=SEMANTIC_CACHE_DIR)
+    canonical = json.dumps(template, sort_keys=True, default=str)
+    tpl_hash = hashlib.sha256(f"{model}\0{canonical}".encode("utf-8")).hexdigest()[:32]
+    return _semantic_client.get_or_create_collection(
+        name=f"formfill-{tpl_hash}",
+        metadata={"hnsw:space": "cosine"}
+    )
+
+
+def _semantic_cache_get(template: Dict[str, Any], prompt: str, model: str) -> Optional[Dict[str, Any]]:
+    try:
+        collection = _semantic_collection(template, model)
+        if collection.count() == 0:
+            return None
+        res = collection.query(query_texts=[prompt], n_results=1)
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed: %s", e)
+        return None
+
+    if not res["ids"] or not res["ids"][0]:
+        return None
+    distance = res["distances"][0][0]
+    if distance > SEMANTIC_CACHE_MAX_DISTANCE:
+        return None
+    logger.debug("Semantic cache hit (distance=%.4f)", distance)
+    return json.loads(res["metadatas"][0][0]["result"])
+
+
+def _semantic_cache_put(template: Dict[str, Any], prompt: str, model: str, value: Dict[str, Any]) -> None:
+    try:
+        _semantic_collection(template, model).add(
+            ids=[uuid.uuid4().hex],
+            documents=[prompt],
+            metadatas=[{"result": json.dumps(value, default=str)}]
+        )
+    except Exception as e:
+        logger.warning("Semantic cache store failed: %s", e)
+
+
+def clear_cache() -> None:
+    """Drop all cached fill results and reset hit/miss counters."""
+    with _fill_cache_lock:
+        _fill_cache.clear()
+        stats["hits"] = 0
+        stats["misses"] = 0
+
+
+def _build_system_prompt(template: Dict[str, Any]) -> str:
+    """Build the template-only instruction listing fields and labels."""
+    fields_list = []
+    for k in sorted(template):
+        label = template[k].get("label") or k
+        fields_list.append(f"{k} ({label})")
+
+    return (
+        "You are an assistant that extracts form fields from a user's free-form text.\n\n"
+        "Given the following form fields:\n"
+        + "\n".join(fields_list)
+        + "\n\nExtract values for each field where missing fields are empty strings. "
+        "Respond with a single JSON object mapping each field name to its value."
+    )
+
 
 def _call_openai_fill(template: Dict[str, Any], prompt: str) -> Dict[str, Any]:
     """Call Groq LLM to extract values for template fields.
@@ -36,79 +185,211 @@ def _call_openai_fill(template: Dict[str, Any], prompt: str) -> Dict[str, Any]:
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise RuntimeError("GROQ_API_KEY not set")
-    client = Groq(api_key=api_key)
-
-    # Build an instruction listing fields and labels.
-    fields_list = []
-    for k, meta in template.items():
-        label = meta.get("label") or k
-        fields_list.append(f"{k} ({label})")
-
-    system = "You are an assistant that extracts form fields from a user's free-form text."
-    user = (
-        "Given the following form fields:\n"
-        + "\n".join(fields_list)
-        + "\n\nExtract values for each field in JSON where missing fields are empty strings.\n\n"
-        + "User text:\n" + prompt
-    )
-
-    model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+    client = _get_groq_client()
+    model = GROQ_MODEL
+
+    # Deterministic calls are served from the cache when possible.
+    cache_key = None
+    if FILL_TEMPERATURE == 0:
+        cache_key = _fill_cache_key(template, prompt, model)
+        cached = _fill_cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached LLM result (%d hits / %d misses)", stats["hits"], stats["misses"])
+            return cached
+
+    if SEMANTIC_CACHE_ENABLED:
+        cached = _semantic_cache_get(template, prompt, model)
+        if cached is not None:
+            if cache_key is not None:
+                _fill_cache_put(cache_key, cached)
+            return cached
+
+    # The system message depends only on the template (fields in sorted
+    # order), so repeated fills share a byte-identical prefix that the
+    # provider's prompt cache can reuse; only the user text varies.
+    system = _build_system_prompt(template)
+    user = "User text:\n" + prompt
 
     # Log the LLM request
-    print(f"\n{'='*80}")
-    print(f"🧠 GROQ LLM REQUEST")
-    print(f"{'='*80}")
-    print(f"🤖 Model: {model}")
-    print(f"\n📋 System Prompt:\n{'-'*80}\n{system}\n{'-'*80}")
-    print(f"\n👤 User Prompt:\n{'-'*80}\n{user}\n{'-'*80}")
-
-    # Use ChatCompletion with Groq SDK
+    logger.debug("Groq LLM request (model=%s)\nSystem prompt:\n%s\nUser prompt:\n%s", model, system, user)
+
+    # JSON mode guarantees the completion is a single parseable object
     try:
         resp = client.chat.completions.create(
             model=model,
             messages=[{"role": "system", "content": system},
                       {"role": "user", "content": user}],
             max_tokens=512,
-            temperature=0,
+            temperature=FILL_TEMPERATURE,
+            response_format={"type": "json_object"},
         )
         text = resp.choices[0].message.content.strip()
 
         # Log the LLM response
-        print(f"\n💬 RAW LLM RESPONSE:")
-        print(f"{'-'*80}\n{text}\n{'-'*80}")
+        logger.debug("Raw LLM response:\n%s", text)
 
     except Exception as e:
-        print(f"\n❌ Groq API Error: {e}")
-        raise RuntimeError(f"Groq API request failed: {e}")
+        logger.error("Groq API error: %s", e)
+        raise RuntimeError(f"Groq API request failed: {e}") from e
 
-    # Try to find a JSON blob in the output
-    m = re.search(r"\{(?:.|\n)*\}", text)
-    if not m:
-        # fallback: try to parse the whole text
-        try:
-            parsed = json.loads(text)
-            print(f"\n✅ Parsed JSON (full text):")
-        except Exception:
-            print(f"\n❌ Failed to parse JSON from response")
-            raise RuntimeError("Could not parse JSON from Groq response")
-    else:
-        parsed = json.loads(m.group(0))
-        print(f"\n✅ Parsed JSON (extracted from text):")
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        logger.error("Failed to parse JSON from Groq response")
+        raise RuntimeError("Could not parse JSON from Groq response")
 
-    print(f"{'-'*80}\n{json.dumps(parsed, indent=2)}\n{'-'*80}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Parsed JSON:\n%s", json.dumps(parsed, indent=2))
 
     # Ensure all keys exist
     out = {}
     for k in template.keys():
         out[k] = parsed.get(k, "") if isinstance(parsed, dict) else ""
 
-    print(f"\n✨ Extracted {sum(1 for v in out.values() if v)}/{len(out)} fields")
-    print(f"{'='*80}\n")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Extracted %d/%d fields", sum(1 for v in out.values() if v), len(out))
+
+    if cache_key is not None:
+        _fill_cache_put(cache_key, out)
+    if SEMANTIC_CACHE_ENABLED:
+        _semantic_cache_put(template, prompt, model, out)
 
     return out
 
 
 
+# Bulk filling: prompts are fanned out over worker threads that share the
+# cached Groq client, bounded so we stay under the account's rate limits.
+FILL_BATCH_CONCURRENCY = int(os.getenv("FILL_BATCH_CONCURRENCY", 8))
+FILL_BATCH_MAX_RETRIES = 3
+
+
+def _rate_limit_delay(exc: BaseException) -> Optional[float]:
+    """Return the back-off delay for a Groq 429, or None for any other error.
+
+    Groq signals rate limiting with HTTP 429 and a ``retry-after`` header
+    (alongside ``x-ratelimit-reset-requests``/``x-ratelimit-reset-tokens``).
+    """
+    cause = exc.__cause__
+    if getattr(cause, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(cause, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+async def _acall_openai_fill_many(template: Dict[str, Any], prompts: List[str],
+                                  concurrency: int = FILL_BATCH_CONCURRENCY) -> List[Dict[str, Any]]:
+    """Run `_call_openai_fill` for every prompt with at most `concurrency` in flight."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _fill_one(prompt: str) -> Dict[str, Any]:
+        async with sem:
+            for attempt in range(FILL_BATCH_MAX_RETRIES + 1):
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(None, _call_openai_fill, template, prompt)
+                except RuntimeError as e:
+                    delay = _rate_limit_delay(e)
+                    if delay is None or attempt == FILL_BATCH_MAX_RETRIES:
+                        raise
+                    logger.warning("Groq rate limit hit, retrying in %.1fs", delay * 2 ** attempt)
+                    await asyncio.sleep(delay * 2 ** attempt)
+
+    return await asyncio.gather(*(_fill_one(p) for p in prompts))
+
+
+def fill_forms_batch(template: Dict[str, Any], prompts: List[str],
+                     concurrency: int = FILL_BATCH_CONCURRENCY) -> List[Dict[str, Any]]:
+    """Fill the same template from many prompts concurrently.
+
+    Args:
+        template: Form template dictionary
+        prompts: User input texts, one per form
+        concurrency: Maximum number of simultaneous Groq requests
+
+    Returns:
+        List of filled forms aligned with the order of `prompts`
+
+    Raises:
+        RuntimeError: If Groq package not installed, API key not set, or a
+            request keeps failing after rate-limit retries
+    """
+    if not groq_available:
+        raise RuntimeError("groq package not installed. Run: pip install groq")
+    if not prompts:
+        return []
+    return asyncio.run(_acall_openai_fill_many(template, prompts, concurrency))
+
+
+_PRODUCT_DESC_NAMES = frozenset(['description', 'product_name', 'goods_description'])
+
+
+@functools.lru_cache(maxsize=256)
+def _locate_roles(template_keys: tuple) -> tuple:
+    """Find the (product description field, HS code field) among template keys.
+
+    `template_keys` must be sorted so the result does not depend on dict
+    order. A key containing both "product" and "desc" wins over the generic
+    description names. Either element is None when no field matches.
+    """
+    lowered = [(k, k.lower()) for k in template_keys]
+    product_field = next((k for k, low in lowered if 'product' in low and 'desc' in low), None)
+    if product_field is None:
+        product_field = next((k for k, low in lowered if low in _PRODUCT_DESC_NAMES), None)
+    hs_field = next((k for k, low in lowered if 'hs' in low and 'code' in low), None)
+    return product_field, hs_field
+
+
+# HS classification runs on these threads while the form-fill request is in flight.
+_hs_executor = ThreadPoolExecutor(max_workers=FILL_BATCH_CONCURRENCY, thread_name_prefix="hs-classify")
+
+
+def _classify_hs(product_desc: str) -> List[Dict[str, Any]]:
+    from llm_hs_classifier import get_classifier
+    return get_classifier().classify(product_desc, top_n=1)
+
+
+# Product text that can be classified before the fill returns: a labelled
+# line ("Product: ...") or a quantity phrase ("500 units of cotton shirts to ...")
+_PRODUCT_LABEL_RE = re.compile(
+    r'^\s*(?:product(?:\s+description)?|goods(?:\s+description)?|description\s+of\s+goods|commodity|item)'
+    r'\s*[:=]\s*(.+?)\s*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+_PRODUCT_QUANTITY_RE = re.compile(
+    r'\b\d[\d,.]*\s*(?:x\s+)?'
+    r'(?:(?:units?|pcs|pieces|boxes|cartons|cases|pallets|bags|kgs?|lbs?|tons?|tonnes?|sets?|pairs?|dozen)\s+)?'
+    r'(?:of\s+)?'
+    r'(?!(?:to|from|for|via|by|at|on|with|and)\b)([a-z][^,.;:\n]*?)'
+    r'\s*(?=\b(?:to|from|for|via|by|at|on|with)\b|[,.;:\n]|$)',
+    re.IGNORECASE,
+)
+
+_ADDRESS_WORDS = frozenset([
+    'st', 'street', 'rd', 'road', 'ave', 'avenue', 'blvd', 'boulevard', 'ln', 'lane',
+    'dr', 'drive', 'way', 'ct', 'court', 'suite', 'floor', 'hwy', 'highway',
+])
+
+
+def _extract_product_text(prompt: str) -> Optional[str]:
+    """Guess the product description in a raw prompt, or None if unsure."""
+    match = _PRODUCT_LABEL_RE.search(prompt)
+    if match:
+        return match.group(1)
+    for match in _PRODUCT_QUANTITY_RE.finditer(prompt):
+        text = match.group(1)
+        # "55 Elm Road" is a street address, not a product
+        if len(text) >= 3 and text.split()[-1].lower().rstrip('.') not in _ADDRESS_WORDS:
+            return text
+    return None
+
+
+def _same_text(a: str, b: str) -> bool:
+    return ' '.join(a.lower().split()) == ' '.join(b.lower().split())
+
 
 def fill_form(template: Dict[str, Any], prompt: str, use_openai: bool = True, db_data: Optional[Dict[str, Any]] = None, auto_classify_hs: bool = False) -> Dict[str, Any]:
     """Fill the template from prompt using Groq LLM.
@@ -129,6 +410,18 @@ def fill_form(template: Dict[str, Any], prompt: str, use_openai: bool = True, db
     if not groq_available:
         raise RuntimeError("groq package not installed. Run: pip install groq")
 
+    # The product description and HS code fields are known from the template
+    # alone. When the prompt's product can be picked out up front, its
+    # classification starts alongside the fill so the two LLM round-trips
+    # overlap instead of running back to back.
+    product_field = hs_field = candidate = hs_future = None
+    if auto_classify_hs:
+        product_field, hs_field = _locate_roles(tuple(sorted(template)))
+        if product_field and hs_field:
+            candidate = _extract_product_text(prompt)
+            if candidate:
+                hs_future = _hs_executor.submit(_classify_hs, candidate)
+
     # Extract values using LLM
     result = _call_openai_fill(template, prompt)
 
@@ -138,39 +431,32 @@ def fill_form(template: Dict[str, Any], prompt: str, use_openai: bool = True, db
             if not result.get(key) and key in db_data:
                 result[key] = db_data[key]
 
-    # Auto-classify HS codes if requested
-    if auto_classify_hs:
+    # Apply the HS classification if the form describes a product
+    if product_field and hs_field:
         try:
-            from llm_hs_classifier import get_classifier
-            hs_classifier = get_classifier()
-
-            # Look for product description fields
-            product_desc = None
-            for key in result.keys():
-                if 'product' in key.lower() and 'desc' in key.lower():
-                    product_desc = result.get(key)
-                    break
-                elif key.lower() in ['description', 'product_name', 'goods_description']:
-                    product_desc = result.get(key)
-                    break
-
-            # If we found a product description, classify it
-            if product_desc and product_desc.strip():
-                print(f"\n🔍 Auto-classifying HS code for: {product_desc}")
-                classification = hs_classifier.classify(product_desc, top_n=1)
-
-                if classification.get('suggestions') and len(classification['suggestions']) > 0:
-                    best_match = classification['suggestions'][0]
+            product_desc = result.get(product_field)
+
+            if not (isinstance(product_desc, str) and product_desc.strip()):
+                if hs_future is not None:
+                    hs_future.cancel()
+            else:
+                logger.debug("Applying HS classification for: %s", product_desc)
+                if hs_future is not None and _same_text(candidate, product_desc):
+                    suggestions = hs_future.result()
+                else:
+                    # The fill settled on different product text than the
+                    # prompt heuristic: classify what goes on the form
+                    if hs_future is not None:
+                        hs_future.cancel()
+                    suggestions = _classify_hs(product_desc)
+
+                if suggestions:
+                    best_match = suggestions[0]
                     hs_code = best_match.get('hs_code', '')
-
-                    # Find HS code field and populate it
-                    for key in result.keys():
-                        if 'hs' in key.lower() and 'code' in key.lower():
-                            result[key] = hs_code
-                            print(f"✅ Auto-filled HS code: {hs_code} (confidence: {best_match.get('confidence', 0):.2%})")
-                            break
+                    result[hs_field] = hs_code
+                    logger.debug("Auto-filled HS code: %s (confidence: %.2f)", hs_code, best_match.get('confidence', 0))
         except Exception as e:
-            print(f"⚠️  HS code auto-classification failed: {e}")
+            logger.warning("HS code auto-classification failed: %s", e)
             # Don't fail the entire form filling if HS classification fails
 
     return result
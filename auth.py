@@ -3,9 +3,13 @@ Authentication and Authorization Module
 JWT-based authentication with role-based access control
 """
 
-from functools import wraps
-from flask import request, jsonify
+from functools import lru_cache, wraps
+from flask import current_app, request, jsonify
 from datetime import datetime, timedelta
+from sqlalchemy import case, event, update
+import atexit
+import threading
+import time
 import jwt
 import os
 from models import User, UserRole, db
@@ -16,8 +20,41 @@ JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
 PASSWORD_MIN_LENGTH = int(os.getenv('PASSWORD_MIN_LENGTH', 8))
 
 # Token blacklist for logout functionality
-# In production, use Redis or similar cache
-token_blacklist = set()
+# Stored in Redis when REDIS_URL is configured so every worker sees it and
+# entries expire together with the token; otherwise kept in-process as
+# token -> expiry timestamp, pruned of expired tokens on each logout.
+REDIS_URL = os.getenv('REDIS_URL')
+try:
+    import redis
+    _redis = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+except ImportError:
+    _redis = None
+
+token_blacklist = {}
+
+# Verified token payloads, keyed by token -> (cached_until, payload).
+# Entries live at most TOKEN_CACHE_TTL_SECONDS and never past the token's
+# own expiry; the blacklist is still consulted before the cache.
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_SIZE = 50000
+_decoded_tokens = {}
+
+# Short-lived cache of authenticated users, keyed by user id.
+# Entries are detached snapshots that get merged into the request's session
+# without a round-trip; the TTL bounds how long role/active changes lag.
+USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 30))
+USER_CACHE_MAX_SIZE = 10000
+_user_cache = {}
+
+# last_login timestamps waiting to be written, keyed by user id.
+# A background thread flushes them in one UPDATE every few seconds, or
+# sooner once LAST_LOGIN_FLUSH_BATCH users are pending.
+LAST_LOGIN_FLUSH_SECONDS = int(os.getenv('LAST_LOGIN_FLUSH_SECONDS', 5))
+LAST_LOGIN_FLUSH_BATCH = int(os.getenv('LAST_LOGIN_FLUSH_BATCH', 500))
+_last_login_buffer = {}
+_last_login_lock = threading.Lock()
+_last_login_wakeup = threading.Event()
+_last_login_flusher = None
 
 def generate_token(user):
     """Generate JWT token for authenticated user"""
@@ -30,14 +67,37 @@ def generate_token(user):
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
+def _blacklist_key(token):
+    return f"bl:{token}"
+
+def is_token_blacklisted(token):
+    """Check whether a token has been revoked"""
+    if _redis is not None:
+        try:
+            return bool(_redis.exists(_blacklist_key(token)))
+        except redis.RedisError:
+            pass
+    expires_at = token_blacklist.get(token)
+    return expires_at is not None and expires_at > time.time()
+
 def decode_token(token):
     """Decode and verify JWT token"""
     try:
         # Check if token is blacklisted
-        if token in token_blacklist:
+        if is_token_blacklisted(token):
             return None
 
+        now = time.time()
+        entry = _decoded_tokens.get(token)
+        if entry and entry[0] > now:
+            return entry[1]
+
         payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+
+        if len(_decoded_tokens) >= TOKEN_CACHE_MAX_SIZE:
+            _decoded_tokens.clear()
+        cached_until = min(float(payload.get('exp', now)), now + TOKEN_CACHE_TTL_SECONDS)
+        _decoded_tokens[token] = (cached_until, payload)
         return payload
     except jwt.ExpiredSignatureError:
         return None
@@ -45,8 +105,28 @@ def decode_token(token):
         return None
 
 def blacklist_token(token):
-    """Add token to blacklist (logout)"""
-    token_blacklist.add(token)
+    """Add token to blacklist (logout) until the token itself expires"""
+    _decoded_tokens.pop(token, None)
+    now = time.time()
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'verify_exp': False})
+        expires_at = float(payload['exp'])
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        expires_at = now + JWT_EXPIRATION_HOURS * 3600
+
+    if expires_at <= now:
+        return True
+
+    if _redis is not None:
+        try:
+            _redis.set(_blacklist_key(token), '1', ex=max(1, int(expires_at - now) + 1))
+            return True
+        except redis.RedisError:
+            pass
+
+    for expired in [t for t, exp in token_blacklist.items() if exp <= now]:
+        del token_blacklist[expired]
+    token_blacklist[token] = expires_at
     return True
 
 def validate_password(password):
@@ -60,16 +140,25 @@ def validate_password(password):
     if len(password) < PASSWORD_MIN_LENGTH:
         return False, f"Password must be at least {PASSWORD_MIN_LENGTH} characters long"
 
-    # Check for at least one uppercase letter
-    if not any(c.isupper() for c in password):
+    # Scan once for uppercase, lowercase and digit characters
+    has_upper = has_lower = has_digit = False
+    for c in password:
+        if c.isupper():
+            has_upper = True
+        elif c.islower():
+            has_lower = True
+        elif c.isdigit():
+            has_digit = True
+        if has_upper and has_lower and has_digit:
+            break
+
+    if not has_upper:
         return False, "Password must contain at least one uppercase letter"
 
-    # Check for at least one lowercase letter
-    if not any(c.islower() for c in password):
+    if not has_lower:
         return False, "Password must contain at least one lowercase letter"
 
-    # Check for at least one digit
-    if not any(c.isdigit() for c in password):
+    if not has_digit:
         return False, "Password must contain at least one number"
 
     return True, None
@@ -81,6 +170,95 @@ def get_token_from_header():
         return auth_header.split(' ')[1]
     return None
 
+def _get_cached_user(user_id):
+    """Return the user for `user_id`, served from the TTL cache when fresh"""
+    entry = _user_cache.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return db.session.merge(entry[1], load=False)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        _user_cache.pop(user_id, None)
+        return None
+
+    if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+        _user_cache.clear()
+    db.session.expunge(user)
+    _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+    return db.session.merge(user, load=False)
+
+def invalidate_user_cache(user_id):
+    """Drop a cached user so the next request reloads it from the database"""
+    _user_cache.pop(user_id, None)
+
+@event.listens_for(User, 'after_update')
+def _evict_updated_user(mapper, connection, target):
+    """Role and is_active changes must reach permission checks immediately"""
+    _user_cache.pop(target.id, None)
+
+def flush_last_login():
+    """Write all buffered last_login timestamps with a single UPDATE"""
+    with _last_login_lock:
+        if not _last_login_buffer:
+            return
+        pending = dict(_last_login_buffer)
+        _last_login_buffer.clear()
+
+    try:
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(pending.keys()))
+            .values(last_login=case(pending, value=User.id))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Re-buffer for the next flush; logins recorded meanwhile are newer
+        with _last_login_lock:
+            for user_id, last_login in pending.items():
+                _last_login_buffer.setdefault(user_id, last_login)
+        raise
+
+def start_last_login_flusher(app):
+    """Start the daemon thread that periodically flushes last_login updates
+
+    Runs once per process; later calls return the running thread. Started on
+    the first buffered login, so importing the app (scripts, init_db) does not.
+    """
+    global _last_login_flusher
+
+    def flush():
+        try:
+            with app.app_context():
+                flush_last_login()
+        except Exception as e:
+            print(f"⚠️  Failed to flush last_login updates: {e}")
+
+    def run():
+        while True:
+            _last_login_wakeup.wait(LAST_LOGIN_FLUSH_SECONDS)
+            _last_login_wakeup.clear()
+            flush()
+
+    with _last_login_lock:
+        if _last_login_flusher is None:
+            _last_login_flusher = threading.Thread(target=run, name='last-login-flusher', daemon=True)
+            _last_login_flusher.start()
+            # Write whatever is still buffered when the process exits
+            atexit.register(flush)
+    return _last_login_flusher
+
+def _record_last_login(user_id):
+    """Buffer a last_login update and wake the flusher once enough are pending"""
+    with _last_login_lock:
+        _last_login_buffer[user_id] = datetime.utcnow()
+        pending = len(_last_login_buffer)
+    if _last_login_flusher is None:
+        start_last_login_flusher(current_app._get_current_object())
+    if pending >= LAST_LOGIN_FLUSH_BATCH:
+        _last_login_wakeup.set()
+
 def login_required(f):
     """Decorator to protect routes requiring authentication"""
     @wraps(f)
@@ -94,14 +272,13 @@ def login_required(f):
         if not payload:
             return jsonify({'error': 'Invalid token', 'message': 'Token is invalid or expired'}), 401
 
-        # Get user from database
-        user = User.query.get(payload['user_id'])
+        # Get user (cached for a short TTL to skip the per-request lookup)
+        user = _get_cached_user(payload['user_id'])
         if not user or not user.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
 
-        # Update last login
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Record last login; written in batches by the background flusher
+        _record_last_login(user.id)
 
         # Attach user to request context
         request.current_user = user
@@ -216,18 +393,24 @@ class PermissionChecker:
         },
     }
 
+    # Flattened (role, resource, action) set for a single hash lookup per check
+    _PERM_SET = frozenset(
+        (role, resource, action)
+        for role, resource_map in ROLE_PERMISSIONS.items()
+        for resource, actions in resource_map.items()
+        for action in actions
+    )
+
     @staticmethod
     def can_user(user, resource, action):
         """Check if user has permission for action on resource"""
         if not user or not user.is_active:
             return False
 
-        role_perms = PermissionChecker.ROLE_PERMISSIONS.get(user.role, {})
-        resource_perms = role_perms.get(resource, [])
-
-        return action in resource_perms
+        return (user.role, resource, action) in PermissionChecker._PERM_SET
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def check_permission(resource, action):
         """Decorator to check specific permission"""
         def decorator(f):
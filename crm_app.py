@@ -6,13 +6,23 @@ Complete RESTful API with authentication, CRM, inventory, orders, and integratio
 from pathlib import Path
 from datetime import datetime, date, timedelta
 from typing import List
+import base64
+import hashlib
 import json
+import math
 import os
+import secrets
+import threading
+import time
 
 from flask import Flask, jsonify, render_template, request, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_migrate import Migrate
-from sqlalchemy import or_, and_, func
+import orjson
+from sqlalchemy import inspect as sa_inspect, or_, and_, case, func, literal, tuple_, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import raiseload, selectinload, undefer_group
 from werkzeug.utils import secure_filename
 
 # Import existing functionality
@@ -25,8 +35,13 @@ from models import Product, Order, OrderStatus, OrderItem, Invoice, Payment, Pay
 from models import Shipment, ShipmentStatus, Document, DocumentType, Activity, ActivityType
 from models import Task, Notification, Warehouse, InventoryItem, ExchangeRate
 from auth import generate_token, login_required, role_required, can_create, can_read, can_update, can_delete, validate_password, blacklist_token
+from auth import invalidate_user_cache
 from integrations import IntegrationFactory
 
+# Enum lookups by upper-cased name; .get() lets bad input become a 400
+_COMPANY_TYPE = {m.name: m for m in CompanyType}
+_USER_ROLE = {m.name: m for m in UserRole}
+
 # Import HS classifier
 try:
     from llm_hs_classifier import get_classifier
@@ -44,6 +59,86 @@ WEB_ROOT = BASE_DIR / "web"
 UPLOAD_FOLDER = BASE_DIR / "uploads"
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, deferring to Flask's default hook for
+    types orjson does not serialize natively (e.g. Decimal)"""
+
+    def _dumps_bytes(self, obj, sort_keys=None, indent=None, newline=False):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, kwargs.get('sort_keys'), kwargs.get('indent')).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of the
+        # base class's decode to str and re-encode. Argument handling
+        # mirrors jsonify(): kwargs, a single value, or several as a list.
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args:
+            obj = kwargs
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = list(args)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent=indent, newline=True), mimetype=self.mimetype
+        )
+
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv('DB_POOL_TIMEOUT_SECONDS', 30))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 3600))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+
+def _engine_options(database_url: str) -> dict:
+    """SQLAlchemy engine options for `database_url`.
+
+    Server databases get a sized, recycled and pre-pinged connection pool;
+    PostgreSQL also gets a per-statement timeout and, on psycopg2, batched
+    executemany for UPDATE/DELETE. Set DB_ECHO_POOL to log pool checkouts.
+    """
+    options = {
+        # Batched INSERTs (executemany / RETURNING) are sent 1000 rows per statement
+        'insertmanyvalues_page_size': 1000,
+        'query_cache_size': 1200,
+        'pool_pre_ping': True,
+        'pool_recycle': DB_POOL_RECYCLE_SECONDS,
+    }
+    if os.getenv('DB_ECHO_POOL'):
+        options['echo_pool'] = 'debug'
+
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    )
+    if url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+        if url.get_driver_name() == 'psycopg2':
+            options['executemany_mode'] = 'values_plus_batch'
+    return options
+
+
 # Initialize Flask app
 app = Flask(
     __name__,
@@ -51,12 +146,14 @@ app = Flask(
     static_folder=str(WEB_ROOT / "static"),
     static_url_path="/static",
 )
+app.json = OrjsonProvider(app)
 
 # Configuration
 # Use JWT_SECRET_KEY if available, fallback to SECRET_KEY for consistency with auth.py
 app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY') or os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///trade_crm.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -72,6 +169,27 @@ except Exception as e:
     print(f"Warning: Vector DB not available: {e}")
     vector_db = None
 
+def _store_rate_snapshot(base_currency, rates, rate_date):
+    """Record a freshly fetched rate snapshot in exchange_rates (once per day)"""
+    snapshot_date = date.fromisoformat(rate_date) if rate_date else date.today()
+    # A separate app context gets its own session, so this commit never
+    # flushes whatever the calling request has pending
+    with app.app_context():
+        try:
+            existing = {
+                code for (code,) in db.session.query(ExchangeRate.to_currency)
+                .filter_by(from_currency=base_currency, date=snapshot_date)
+            }
+            db.session.bulk_insert_mappings(ExchangeRate, [
+                {'from_currency': base_currency, 'to_currency': code, 'rate': rate, 'date': snapshot_date}
+                for code, rate in rates.items() if code not in existing
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Could not store exchange rate snapshot: {e}")
+
+
 # Initialize integration services
 payment_service = None
 shipping_service = None
@@ -84,17 +202,206 @@ try:
     shipping_service = IntegrationFactory.get_shipping_service()
     email_service = IntegrationFactory.get_email_service()
     exchange_service = IntegrationFactory.get_exchange_rate_service()
+    exchange_service.on_refresh = _store_rate_snapshot
     customs_service = IntegrationFactory.get_customs_service()
     print("✅ Integration services initialized")
 except Exception as e:
     print(f"⚠️  Some integration services not available: {e}")
 
 
+# Template listing, rescanned only when the directory's mtime changes
+_tpl_cache = {"mtime": None, "files": []}
+
+
 def _list_form_templates() -> List[str]:
     """List available form templates"""
     if not TEMPLATE_ROOT.exists():
         return []
-    return [p.name for p in TEMPLATE_ROOT.glob("*.json")]
+    mtime = TEMPLATE_ROOT.stat().st_mtime
+    if mtime != _tpl_cache["mtime"]:
+        _tpl_cache["files"] = [p.name for p in TEMPLATE_ROOT.glob("*.json")]
+        _tpl_cache["mtime"] = mtime
+    return list(_tpl_cache["files"])
+
+
+def _encode_cursor(*values) -> str:
+    """Encode keyset pagination values as an opaque URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    """Decode a cursor from _encode_cursor, returning None if malformed"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+
+
+def _arg_flag(name: str) -> bool:
+    """Read a boolean query-string flag such as ?include_total=true"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+# Product list totals, keyed by (category, search) -> (expires_monotonic, total).
+# Saves a COUNT(*) per page view; cleared whenever this process adds a product.
+PRODUCT_COUNT_TTL_SECONDS = int(os.getenv('PRODUCT_COUNT_TTL_SECONDS', 60))
+_product_count_cache = {}
+
+
+def _cached_product_count(query, category, search) -> int:
+    """Return the row count for a filtered product query, cached briefly"""
+    key = (category, search)
+    entry = _product_count_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    total = query.order_by(None).count()
+    if len(_product_count_cache) >= 1000:
+        _product_count_cache.clear()
+    _product_count_cache[key] = (time.monotonic() + PRODUCT_COUNT_TTL_SECONDS, total)
+    return total
+
+
+def _column_rows(query, model):
+    """Fetch plain column rows for `query` instead of mapped instances.
+
+    The list endpoints' to_dict() methods read column attributes only, so
+    `model.to_dict(row)` serializes these rows directly while skipping ORM
+    identity-map and instrumentation overhead. Non-deferred SQL expression
+    attributes (e.g. Invoice.balance) are selected alongside the columns.
+    """
+    return query.with_entities(*(
+        prop.class_attribute for prop in sa_inspect(model).column_attrs if not prop.deferred
+    )).all()
+
+
+def _product_dicts(rows):
+    """Serialize product rows with total_stock from one grouped SUM"""
+    stock = dict(
+        db.session.query(InventoryItem.product_id, func.sum(InventoryItem.quantity_available))
+        .filter(InventoryItem.product_id.in_([row.id for row in rows]))
+        .group_by(InventoryItem.product_id)
+        .all()
+    ) if rows else {}
+
+    products = []
+    for row in rows:
+        data = Product.to_dict(row)
+        data['total_stock'] = stock.get(row.id) or 0
+        products.append(data)
+    return products
+
+
+EXCHANGE_RATES_TTL_SECONDS = int(os.getenv('EXCHANGE_RATES_TTL_SECONDS', 900))
+DUTY_CACHE_TTL_SECONDS = int(os.getenv('DUTY_CACHE_TTL_SECONDS', 86400))
+INTEGRATION_CACHE_MAX_SIZE = 1024
+_integration_cache = {}
+
+
+def _integration_cached(key, ttl: int, compute):
+    """Return compute() for `key`, reusing the result for `ttl` seconds.
+
+    Empty results (the services' way of reporting an upstream failure) are
+    not cached so the next request retries.
+    """
+    now = time.monotonic()
+    entry = _integration_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    value = compute()
+    if value:
+        if len(_integration_cache) >= INTEGRATION_CACHE_MAX_SIZE:
+            _integration_cache.clear()
+        _integration_cache[key] = (now + ttl, value)
+    return value
+
+
+_CROCKFORD32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_ulid_lock = threading.Lock()
+_ulid_last = [0, 0]
+
+
+def _new_ulid() -> str:
+    """Monotonic ULID: 48-bit ms timestamp + 80 random bits, Crockford base32.
+
+    Unique across concurrent requests and lexically ordered by creation time.
+    """
+    with _ulid_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _ulid_last[0]:
+            now_ms = _ulid_last[0]
+            rand = _ulid_last[1] + 1
+        else:
+            rand = secrets.randbits(80)
+        _ulid_last[0], _ulid_last[1] = now_ms, rand
+
+    value = (now_ms << 80) | (rand & ((1 << 80) - 1))
+    return ''.join(_CROCKFORD32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _save_upload(file, file_path: str) -> int:
+    """Write an uploaded file in 1MB chunks and return its size in bytes"""
+    size = 0
+    with open(file_path, 'wb') as out:
+        while chunk := file.stream.read(UPLOAD_CHUNK_SIZE):
+            out.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def _name_id_page(query, model, per_page: int, fetch=None):
+    """Keyset page over (name, id), ascending, for ?cursor= (empty for the first page)
+
+    Walks the list without OFFSET or COUNT(*). `fetch` turns the final query
+    into rows (default: query.all()). Returns (items, has_more, next_cursor),
+    or None if the cursor is not one this function produced.
+    """
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = _decode_cursor(cursor)
+        if not (isinstance(values, list) and len(values) == 2
+                and isinstance(values[0], str) and type(values[1]) is int):
+            return None
+        query = query.filter(tuple_(model.name, model.id) > tuple(values))
+
+    per_page = max(per_page, 1)
+    query = query.order_by(model.name, model.id).limit(per_page + 1)
+    items = fetch(query) if fetch else query.all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    next_cursor = _encode_cursor(items[-1].name, items[-1].id) if has_more else None
+    return items, has_more, next_cursor
+
+
+def _created_at_page(query, model, key: str):
+    """Keyset page over (created_at, id), newest first, for ?cursor=&limit=
+
+    An empty cursor starts at the newest row; `next_cursor` continues from
+    the last row returned.
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = _decode_cursor(cursor)
+        try:
+            created_at, last_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, last_id))
+
+    rows = _column_rows(query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1), model)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        key: [model.to_dict(r) for r in rows],
+        'has_more': has_more,
+        'next_cursor': _encode_cursor(rows[-1].created_at.isoformat(), rows[-1].id) if has_more else None
+    })
 
 
 # ============================================================================
@@ -158,6 +465,10 @@ def register():
     if not is_valid:
         return jsonify({'error': error_msg}), 400
 
+    role = _USER_ROLE.get(str(data.get('role', 'VIEWER')).upper())
+    if role is None:
+        return jsonify({'error': 'Invalid role'}), 400
+
     # Check if user exists
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'Email already registered'}), 409
@@ -170,7 +481,7 @@ def register():
         username=data['username'],
         first_name=data['first_name'],
         last_name=data['last_name'],
-        role=UserRole[data.get('role', 'VIEWER').upper()],
+        role=role,
         phone=data.get('phone')
     )
     user.set_password(data['password'])
@@ -237,6 +548,7 @@ def logout():
     token = get_token_from_header()
     if token:
         blacklist_token(token)
+    invalidate_user_cache(request.current_user.id)
 
     return jsonify({
         'message': 'Logged out successfully'
@@ -251,15 +563,20 @@ def logout():
 @can_read('companies')
 def get_companies():
     """Get all companies with filtering"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(request.args.get('per_page', 50, type=int), 1)
     company_type = request.args.get('type')
     search = request.args.get('search')
 
-    query = Company.query
+    # to_dict() serializes columns only; make any relationship access raise
+    # instead of silently issuing one lazy load per row
+    query = Company.query.options(raiseload('*'))
 
     if company_type:
-        query = query.filter_by(company_type=CompanyType[company_type.upper()])
+        ct = _COMPANY_TYPE.get(company_type.upper())
+        if ct is None:
+            return jsonify({'error': 'Invalid company_type'}), 400
+        query = query.filter_by(company_type=ct)
 
     if search:
         query = query.filter(or_(
@@ -267,14 +584,38 @@ def get_companies():
             Company.email.ilike(f'%{search}%')
         ))
 
-    pagination = query.order_by(Company.name).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Keyset mode: ?cursor= (empty for the first page) walks (name, id) in
+    # order without OFFSET or COUNT(*)
+    if 'cursor' in request.args:
+        keyset = _name_id_page(query, Company, per_page)
+        if keyset is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        items, has_more, next_cursor = keyset
+
+        return jsonify({
+            'companies': [c.to_dict() for c in items],
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        })
+
+    query = query.order_by(Company.name, Company.id)
+
+    # The total count is an extra full scan, so only run it on request
+    if _arg_flag('include_total'):
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        return jsonify({
+            'companies': [c.to_dict() for c in pagination.items],
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'current_page': page
+        })
+
+    items = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    has_more = len(items) > per_page
 
     return jsonify({
-        'companies': [c.to_dict() for c in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
+        'companies': [c.to_dict() for c in items[:per_page]],
+        'has_more': has_more,
         'current_page': page
     })
 
@@ -283,7 +624,9 @@ def get_companies():
 @can_read('companies')
 def get_company(company_id):
     """Get company by ID"""
-    company = Company.query.get_or_404(company_id)
+    company = Company.query.options(
+        selectinload(Company.contacts), undefer_group('relationship_counts')
+    ).get_or_404(company_id)
     return jsonify(company.to_dict(include_relationships=True))
 
 
@@ -293,10 +636,14 @@ def create_company():
     """Create new company"""
     data = request.get_json()
 
+    company_type = _COMPANY_TYPE.get(str(data.get('company_type', '')).upper())
+    if company_type is None:
+        return jsonify({'error': 'Invalid company_type'}), 400
+
     company = Company(
         name=data['name'],
         legal_name=data.get('legal_name'),
-        company_type=CompanyType[data['company_type'].upper()],
+        company_type=company_type,
         tax_id=data.get('tax_id'),
         website=data.get('website'),
         email=data.get('email'),
@@ -329,6 +676,12 @@ def update_company(company_id):
     company = Company.query.get_or_404(company_id)
     data = request.get_json()
 
+    if 'company_type' in data:
+        company_type = _COMPANY_TYPE.get(str(data['company_type']).upper())
+        if company_type is None:
+            return jsonify({'error': 'Invalid company_type'}), 400
+        company.company_type = company_type
+
     # Update fields
     for field in ['name', 'legal_name', 'tax_id', 'website', 'email', 'phone',
                   'address_line1', 'address_line2', 'city', 'state', 'postal_code',
@@ -336,9 +689,6 @@ def update_company(company_id):
         if field in data:
             setattr(company, field, data[field])
 
-    if 'company_type' in data:
-        company.company_type = CompanyType[data['company_type'].upper()]
-
     db.session.commit()
 
     return jsonify({
@@ -369,7 +719,7 @@ def get_contacts():
     company_id = request.args.get('company_id', type=int)
     search = request.args.get('search')
 
-    query = Contact.query
+    query = Contact.query.options(raiseload('*'))
 
     if company_id:
         query = query.filter_by(company_id=company_id)
@@ -424,15 +774,18 @@ def get_leads():
     status = request.args.get('status')
     assigned_to = request.args.get('assigned_to', type=int)
 
-    query = Lead.query
+    query = Lead.query.options(raiseload('*'))
 
     if status:
         query = query.filter_by(status=LeadStatus[status.upper()])
     if assigned_to:
         query = query.filter_by(assigned_to=assigned_to)
 
-    leads = query.order_by(Lead.created_at.desc()).all()
-    return jsonify([l.to_dict() for l in leads])
+    if 'cursor' in request.args:
+        return _created_at_page(query, Lead, 'leads')
+
+    leads = _column_rows(query.order_by(Lead.created_at.desc()), Lead)
+    return jsonify([Lead.to_dict(l) for l in leads])
 
 
 @app.route("/api/leads", methods=["POST"])
@@ -476,8 +829,8 @@ def get_products():
     """Get all products"""
     category = request.args.get('category')
     search = request.args.get('search')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(request.args.get('per_page', 50, type=int), 1)
 
     query = Product.query.filter_by(is_active=True)
 
@@ -491,12 +844,27 @@ def get_products():
             Product.description.ilike(f'%{search}%')
         ))
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Keyset mode: ?cursor= (empty for the first page) walks (name, id) in
+    # order without OFFSET or COUNT(*)
+    if 'cursor' in request.args:
+        keyset = _name_id_page(query, Product, per_page, fetch=lambda q: _column_rows(q, Product))
+        if keyset is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        items, has_more, next_cursor = keyset
+
+        return jsonify({
+            'products': _product_dicts(items),
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        })
+
+    total = _cached_product_count(query, category, search)
+    items = _column_rows(query.order_by(Product.name, Product.id).offset((page - 1) * per_page).limit(per_page), Product)
 
     return jsonify({
-        'products': [p.to_dict(include_inventory=True) for p in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
+        'products': _product_dicts(items),
+        'total': total,
+        'pages': math.ceil(total / per_page),
         'current_page': page
     })
 
@@ -538,6 +906,7 @@ def create_product():
 
     db.session.add(product)
     db.session.commit()
+    _product_count_cache.clear()
 
     return jsonify({
         'message': 'Product created successfully',
@@ -558,7 +927,8 @@ def get_orders():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
 
-    query = Order.query
+    # Order.to_dict() without items reads columns only
+    query = Order.query.options(raiseload('*'))
 
     if status:
         query = query.filter_by(status=OrderStatus[status.upper()])
@@ -592,7 +962,7 @@ def create_order():
     data = request.get_json()
 
     # Generate order number
-    order_number = f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    order_number = f"ORD-{_new_ulid()}"
 
     order = Order(
         order_number=order_number,
@@ -613,35 +983,44 @@ def create_order():
         sales_person=request.current_user.id
     )
 
-    # Add order items
-    subtotal = 0
-    for item_data in data.get('items', []):
-        product = Product.query.get(item_data['product_id'])
-        if not product:
+    # Check every referenced product exists with a single IN query
+    items_data = data.get('items', [])
+    product_ids = {item_data['product_id'] for item_data in items_data}
+    existing_ids = {
+        product_id for (product_id,) in
+        db.session.query(Product.id).filter(Product.id.in_(product_ids))
+    } if product_ids else set()
+
+    # Build order item rows
+    item_rows = []
+    for item_data in items_data:
+        if item_data['product_id'] not in existing_ids:
             return jsonify({'error': f"Product {item_data['product_id']} not found"}), 404
 
-        line_total = item_data['quantity'] * item_data['unit_price']
-        line_total = line_total * (1 - item_data.get('discount_percent', 0) / 100)
-
-        item = OrderItem(
-            product_id=item_data['product_id'],
-            quantity=item_data['quantity'],
-            unit_price=item_data['unit_price'],
-            discount_percent=item_data.get('discount_percent', 0),
-            tax_percent=item_data.get('tax_percent', 0),
-            line_total=line_total
-        )
-        order.items.append(item)
-        subtotal += line_total
+        item_rows.append({
+            'product_id': item_data['product_id'],
+            'quantity': item_data['quantity'],
+            'unit_price': item_data['unit_price'],
+            'discount_percent': item_data.get('discount_percent', 0),
+            'tax_percent': item_data.get('tax_percent', 0)
+        })
 
     # Calculate totals
-    order.subtotal = subtotal
-    order.tax_amount = subtotal * (data.get('tax_percent', 0) / 100)
-    order.shipping_cost = data.get('shipping_cost', 0)
-    order.discount_amount = data.get('discount_amount', 0)
-    order.total_amount = order.subtotal + order.tax_amount + order.shipping_cost - order.discount_amount
+    order.set_totals(
+        (OrderItem.compute_line_total(row['quantity'], row['unit_price'], row['discount_percent'])
+         for row in item_rows),
+        tax_rate=data.get('tax_percent', 0) / 100,
+        shipping_cost=data.get('shipping_cost', 0),
+        discount_amount=data.get('discount_amount', 0)
+    )
 
+    # Flush for the order id, then insert all items in one multi-row INSERT
     db.session.add(order)
+    db.session.flush()
+    for row in item_rows:
+        row['order_id'] = order.id
+    if item_rows:
+        db.session.bulk_insert_mappings(OrderItem, item_rows)
     db.session.commit()
 
     return jsonify({
@@ -684,15 +1063,18 @@ def get_invoices():
     status = request.args.get('status')
     company_id = request.args.get('company_id', type=int)
 
-    query = Invoice.query
+    query = Invoice.query.options(raiseload('*'))
 
     if status:
         query = query.filter_by(payment_status=PaymentStatus[status.upper()])
     if company_id:
         query = query.filter_by(company_id=company_id)
 
-    invoices = query.order_by(Invoice.created_at.desc()).all()
-    return jsonify([i.to_dict() for i in invoices])
+    if 'cursor' in request.args:
+        return _created_at_page(query, Invoice, 'invoices')
+
+    invoices = _column_rows(query.order_by(Invoice.created_at.desc()), Invoice)
+    return jsonify([Invoice.to_dict(i) for i in invoices])
 
 
 @app.route("/api/invoices", methods=["POST"])
@@ -701,7 +1083,7 @@ def create_invoice():
     """Create new invoice"""
     data = request.get_json()
 
-    invoice_number = f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    invoice_number = f"INV-{_new_ulid()}"
 
     # Get order if specified
     order = None
@@ -740,7 +1122,28 @@ def record_payment():
     """Record a payment"""
     data = request.get_json()
 
-    invoice = Invoice.query.get_or_404(data['invoice_id'])
+    # Apply the payment and derive the new status in one atomic UPDATE, so
+    # concurrent payments against the same invoice cannot lose an increment
+    new_paid = Invoice.amount_paid + data['amount']
+    status_type = Invoice.payment_status.type
+    invoice = db.session.execute(
+        update(Invoice)
+        .where(Invoice.id == data['invoice_id'])
+        .values(
+            amount_paid=new_paid,
+            payment_status=case(
+                (new_paid >= Invoice.total_amount, literal(PaymentStatus.PAID, status_type)),
+                (new_paid > 0, literal(PaymentStatus.PARTIAL, status_type)),
+                (Invoice.due_date < date.today(), literal(PaymentStatus.OVERDUE, status_type)),
+                else_=Invoice.payment_status
+            )
+        )
+        .returning(Invoice)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+    if invoice is None:
+        return jsonify({'error': 'Invoice not found'}), 404
 
     payment = Payment(
         invoice_id=data['invoice_id'],
@@ -752,18 +1155,6 @@ def record_payment():
     )
 
     db.session.add(payment)
-
-    # Update invoice paid amount
-    invoice.amount_paid += data['amount']
-
-    # Update payment status
-    if invoice.amount_paid >= invoice.total_amount:
-        invoice.payment_status = PaymentStatus.PAID
-    elif invoice.amount_paid > 0:
-        invoice.payment_status = PaymentStatus.PARTIAL
-    elif date.today() > invoice.due_date:
-        invoice.payment_status = PaymentStatus.OVERDUE
-
     db.session.commit()
 
     return jsonify({
@@ -784,15 +1175,18 @@ def get_shipments():
     status = request.args.get('status')
     order_id = request.args.get('order_id', type=int)
 
-    query = Shipment.query
+    query = Shipment.query.options(raiseload('*'))
 
     if status:
         query = query.filter_by(status=ShipmentStatus[status.upper()])
     if order_id:
         query = query.filter_by(order_id=order_id)
 
-    shipments = query.order_by(Shipment.created_at.desc()).all()
-    return jsonify([s.to_dict() for s in shipments])
+    if 'cursor' in request.args:
+        return _created_at_page(query, Shipment, 'shipments')
+
+    shipments = _column_rows(query.order_by(Shipment.created_at.desc()), Shipment)
+    return jsonify([Shipment.to_dict(s) for s in shipments])
 
 
 @app.route("/api/shipments", methods=["POST"])
@@ -875,41 +1269,87 @@ def get_inventory():
     if product_id:
         query = query.filter_by(product_id=product_id)
 
-    items = query.all()
-
-    # Filter low stock items
+    # Filter low stock items in SQL against the product's reorder level
     if low_stock:
-        items = [item for item in items if item.product.reorder_level and item.quantity_available <= item.product.reorder_level]
+        query = query.join(Product, InventoryItem.product_id == Product.id).filter(
+            Product.reorder_level.isnot(None),
+            Product.reorder_level != 0,
+            InventoryItem.quantity_available <= Product.reorder_level
+        )
+
+    items = query.all()
 
     return jsonify([item.to_dict() for item in items])
 
 
+def _apply_stock_adjustments(adjustments):
+    """Add each adjustment to its (product_id, warehouse_id) stock level.
+
+    Existing rows are changed by one UPDATE (quantity_available + CASE id ...)
+    so concurrent adjustments cannot lose an increment; pairs with no row yet
+    are inserted in one batch. Returns the adjusted items in input order.
+    """
+    deltas = {}
+    for adjustment in adjustments:
+        key = (adjustment['product_id'], adjustment['warehouse_id'])
+        deltas[key] = deltas.get(key, 0) + adjustment.get('adjustment', 0)
+
+    pair = tuple_(InventoryItem.product_id, InventoryItem.warehouse_id)
+    existing = {
+        (product_id, warehouse_id): item_id for product_id, warehouse_id, item_id in
+        db.session.query(InventoryItem.product_id, InventoryItem.warehouse_id, InventoryItem.id)
+        .filter(pair.in_(list(deltas)))
+    }
+
+    now = datetime.utcnow()
+    if existing:
+        db.session.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id.in_(list(existing.values())))
+            .values(
+                quantity_available=InventoryItem.quantity_available + case(
+                    {item_id: deltas[key] for key, item_id in existing.items()},
+                    value=InventoryItem.id
+                ),
+                last_counted_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+    new_rows = [
+        {'product_id': product_id, 'warehouse_id': warehouse_id,
+         'quantity_available': delta, 'last_counted_at': now}
+        for (product_id, warehouse_id), delta in deltas.items()
+        if (product_id, warehouse_id) not in existing
+    ]
+    if new_rows:
+        db.session.bulk_insert_mappings(InventoryItem, new_rows)
+    db.session.commit()
+
+    items = {
+        (item.product_id, item.warehouse_id): item
+        for item in InventoryItem.query.filter(pair.in_(list(deltas)))
+    }
+    return [items[key] for key in deltas]
+
+
 @app.route("/api/inventory/adjust", methods=["POST"])
 @can_update('inventory')
 def adjust_inventory():
-    """Adjust inventory levels"""
-    data = request.get_json()
+    """Adjust inventory levels
 
-    item = InventoryItem.query.filter_by(
-        product_id=data['product_id'],
-        warehouse_id=data['warehouse_id']
-    ).first()
-
-    if not item:
-        # Create new inventory item
-        item = InventoryItem(
-            product_id=data['product_id'],
-            warehouse_id=data['warehouse_id'],
-            quantity_available=0
-        )
-        db.session.add(item)
+    Takes one {product_id, warehouse_id, adjustment}, or a list of them
+    under 'adjustments' to apply in one batch.
+    """
+    data = request.get_json()
 
-    # Adjust quantity
-    adjustment = data.get('adjustment', 0)
-    item.quantity_available += adjustment
-    item.last_counted_at = datetime.utcnow()
+    if 'adjustments' in data:
+        items = _apply_stock_adjustments(data['adjustments'])
+        return jsonify({
+            'message': 'Inventory adjusted successfully',
+            'inventory': [item.to_dict() for item in items]
+        })
 
-    db.session.commit()
+    item, = _apply_stock_adjustments([data])
 
     return jsonify({
         'message': 'Inventory adjusted successfully',
@@ -996,7 +1436,7 @@ def upload_document():
     # Secure filename
     filename = secure_filename(file.filename)
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    file_size = _save_upload(file, file_path)
 
     # Create document record
     document = Document(
@@ -1004,7 +1444,7 @@ def upload_document():
         title=request.form.get('title', filename),
         file_name=filename,
         file_path=file_path,
-        file_size=os.path.getsize(file_path),
+        file_size=file_size,
         mime_type=file.content_type,
         company_id=request.form.get('company_id', type=int),
         order_id=request.form.get('order_id', type=int),
@@ -1053,13 +1493,28 @@ def get_exchange_rates():
     if not exchange_service:
         return jsonify({'error': 'Exchange rate service not available'}), 503
 
-    rates = exchange_service.get_all_rates(base_currency)
+    def fetch_rates():
+        rates = exchange_service.get_all_rates(base_currency)
+        if not rates:
+            return None
+        return {
+            'base_currency': base_currency,
+            'rates': rates,
+            'timestamp': datetime.utcnow().isoformat()
+        }
 
-    return jsonify({
-        'base_currency': base_currency,
-        'rates': rates,
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    payload = _integration_cached(('rates', base_currency), EXCHANGE_RATES_TTL_SECONDS, fetch_rates)
+    if payload is None:
+        return jsonify({
+            'base_currency': base_currency,
+            'rates': {},
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    # Clients revalidating a cached copy get a 304 until the rates are refetched
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route("/api/integrations/convert", methods=["POST"])
@@ -1070,10 +1525,14 @@ def convert_currency():
     if not exchange_service:
         return jsonify({'error': 'Exchange rate service not available'}), 503
 
-    converted = exchange_service.convert(
-        amount=data['amount'],
-        from_currency=data['from_currency'],
-        to_currency=data['to_currency']
+    converted = _integration_cached(
+        ('convert', data['amount'], data['from_currency'], data['to_currency']),
+        EXCHANGE_RATES_TTL_SECONDS,
+        lambda: exchange_service.convert(
+            amount=data['amount'],
+            from_currency=data['from_currency'],
+            to_currency=data['to_currency']
+        )
     )
 
     return jsonify({
@@ -1092,11 +1551,15 @@ def calculate_duty():
     if not customs_service:
         return jsonify({'error': 'Customs service not available'}), 503
 
-    duty = customs_service.calculate_duty(
-        hs_code=data['hs_code'],
-        value=data['value'],
-        origin_country=data['origin_country'],
-        destination_country=data['destination_country']
+    duty = _integration_cached(
+        ('duty', data['hs_code'], data['value'], data['origin_country'], data['destination_country']),
+        DUTY_CACHE_TTL_SECONDS,
+        lambda: customs_service.calculate_duty(
+            hs_code=data['hs_code'],
+            value=data['value'],
+            origin_country=data['origin_country'],
+            destination_country=data['destination_country']
+        )
     )
 
     return jsonify(duty)
@@ -1412,25 +1875,65 @@ def export_form(format):
 # ANALYTICS & REPORTING ROUTES
 # ============================================================================
 
+# Dashboard response body, shared by all users (it holds no per-user data).
+# Served for up to DASHBOARD_CACHE_TTL_SECONDS; a successful write to one of
+# the resources it summarizes drops it so new orders/invoices show up
+# immediately.
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv('DASHBOARD_CACHE_TTL_SECONDS', 30))
+_DASHBOARD_SOURCES = frozenset(['orders', 'invoices', 'payments', 'shipments', 'companies'])
+_dashboard_cache = {"expires": 0.0, "body": None, "etag": None}
+
+
+@app.after_request
+def _invalidate_dashboard_cache(response):
+    if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+        return response
+    parts = request.path.split('/')
+    if len(parts) > 2 and parts[1] == 'api' and parts[2] in _DASHBOARD_SOURCES:
+        _dashboard_cache["body"] = None
+    return response
+
+
 @app.route("/api/analytics/dashboard", methods=["GET"])
 @login_required
 def get_dashboard_analytics():
-    """Get dashboard analytics"""
-    # Calculate key metrics
-    total_companies = Company.query.count()
-    total_orders = Order.query.count()
-    total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-        Order.payment_status == PaymentStatus.PAID
-    ).scalar() or 0
-
-    pending_orders = Order.query.filter_by(status=OrderStatus.PENDING).count()
-    open_invoices = Invoice.query.filter(
-        Invoice.payment_status.in_([PaymentStatus.PENDING, PaymentStatus.PARTIAL])
-    ).count()
+    """Get dashboard analytics
+
+    Browsers revalidate on every load (no-cache + ETag) and get a 304 while
+    the cached payload is unchanged, so invalidation reaches them at once.
+    """
+    body, etag = _dashboard_cache["body"], _dashboard_cache["etag"]
+    if body is None or _dashboard_cache["expires"] <= time.monotonic():
+        body = jsonify(_build_dashboard_analytics()).get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        _dashboard_cache.update(body=body, etag=etag, expires=time.monotonic() + DASHBOARD_CACHE_TTL_SECONDS)
+
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def _build_dashboard_analytics():
+    """Compute the dashboard metrics, revenue trend and recent activity"""
+    # Calculate key metrics in one round-trip of scalar subqueries
+    metrics = db.session.query(
+        db.session.query(func.count(Company.id)).scalar_subquery().label('total_companies'),
+        db.session.query(func.count(Order.id)).scalar_subquery().label('total_orders'),
+        db.session.query(func.sum(Order.total_amount)).filter(
+            Order.payment_status == PaymentStatus.PAID
+        ).scalar_subquery().label('total_revenue'),
+        db.session.query(func.count(Order.id)).filter(
+            Order.status == OrderStatus.PENDING
+        ).scalar_subquery().label('pending_orders'),
+        db.session.query(func.count(Invoice.id)).filter(
+            Invoice.payment_status.in_([PaymentStatus.PENDING, PaymentStatus.PARTIAL])
+        ).scalar_subquery().label('open_invoices')
+    ).one()
 
     # Calculate monthly revenue trend for the last 12 months
     today = datetime.now()
-    revenue_trend = []
+    month_bounds = []
     month_labels = []
 
     for i in range(11, -1, -1):  # Last 12 months
@@ -1444,29 +1947,30 @@ def get_dashboard_analytics():
         else:
             next_month_start = month_start.replace(month=month_start.month + 1)
 
-        # Query revenue for this month
-        month_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            and_(
-                Order.order_date >= month_start.date(),
-                Order.order_date < next_month_start.date(),
-                Order.payment_status == PaymentStatus.PAID
-            )
-        ).scalar() or 0
-
-        revenue_trend.append(float(month_revenue))
+        month_bounds.append((month_start.date(), next_month_start.date()))
         month_labels.append(month_start.strftime('%b'))
 
+    # Revenue for every month as conditional sums over a single scan
+    month_revenues = db.session.query(*[
+        func.sum(case(
+            (and_(Order.order_date >= start, Order.order_date < end), Order.total_amount),
+            else_=0
+        ))
+        for start, end in month_bounds
+    ]).filter(Order.payment_status == PaymentStatus.PAID).one()
+    revenue_trend = [float(revenue or 0) for revenue in month_revenues]
+
     # Recent activity
     recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
     recent_shipments = Shipment.query.order_by(Shipment.created_at.desc()).limit(5).all()
 
-    return jsonify({
+    return {
         'metrics': {
-            'total_companies': total_companies,
-            'total_orders': total_orders,
-            'total_revenue': float(total_revenue),
-            'pending_orders': pending_orders,
-            'open_invoices': open_invoices
+            'total_companies': metrics.total_companies,
+            'total_orders': metrics.total_orders,
+            'total_revenue': float(metrics.total_revenue or 0),
+            'pending_orders': metrics.pending_orders,
+            'open_invoices': metrics.open_invoices
         },
         'revenue_trend': {
             'labels': month_labels,
@@ -1474,7 +1978,7 @@ def get_dashboard_analytics():
         },
         'recent_orders': [o.to_dict() for o in recent_orders],
         'recent_shipments': [s.to_dict() for s in recent_shipments]
-    })
+    }
 
 
 # ============================================================================
@@ -2,40 +2,342 @@
 # Classification Module
 # -----------------------------
 
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+    onnx_available = True
+except ImportError:
+    onnx_available = False
+
+try:
+    import faiss
+    faiss_available = True
+except ImportError:
+    faiss_available = False
+
+# Score against an int8 copy of the HS matrix (4x smaller, approximate scores)
+HS_EMBEDDINGS_INT8 = os.getenv("HS_EMBEDDINGS_INT8", "0") == "1"
+# Rows widened to float32 at a time when scoring the int8 matrix (~1.5 MB at D=384)
+INT8_BLOCK_ROWS = 1024
+
+# Directory holding an ONNX export of all-MiniLM-L6-v2 (see export_onnx_encoder);
+# when set, queries are encoded with onnxruntime instead of sentence-transformers
+HS_ONNX_MODEL_DIR = os.getenv("HS_ONNX_MODEL_DIR")
+ONNX_MAX_SEQ_LENGTH = 64
+
+# Approximate top-N search through a Faiss IVF-PQ index written by save_hs_index.
+# IVF256 needs roughly 39 training vectors per list, so small catalogs keep the
+# exact matrix scan.
+HS_FAISS_INDEX = os.getenv("HS_FAISS_INDEX", "0") == "1"
+FAISS_INDEX_FACTORY = "IVF256,PQ48"
+FAISS_MIN_TRAIN = 256 * 39
+FAISS_NPROBE = int(os.getenv("HS_FAISS_NPROBE", 8))
 
 # Initialize embedding model (singleton pattern)
 _embedding_model = None
 
+# Query encoding is coalesced: concurrent classify_hs calls arriving within
+# ENCODE_MAX_WAIT_SECONDS share one model.encode() batch of up to ENCODE_MAX_BATCH.
+# A caller waits at most ENCODE_TIMEOUT_SECONDS for the batcher before
+# encoding its query directly.
+ENCODE_MAX_BATCH = 32
+ENCODE_MAX_WAIT_SECONDS = float(os.getenv("HS_ENCODE_MAX_WAIT_MS", 10)) / 1000
+ENCODE_TIMEOUT_SECONDS = float(os.getenv("HS_ENCODE_TIMEOUT_SECONDS", 30))
+_encode_queue = queue.Queue()
+_encode_thread = None
+_encode_thread_lock = threading.Lock()
+
+# L2-normalized HS embedding matrix, rebuilt only when a different entry list is passed in
+_hs_matrix_cache = {"entries": None, "size": 0, "matrix": None, "int8": None, "faiss": None}
+
+
+class OnnxEncoder:
+    """all-MiniLM-L6-v2 on onnxruntime with a fixed-shape input.
+
+    Inputs are always padded to ONNX_MAX_SEQ_LENGTH tokens so the graph runs
+    with static shapes; output is mean-pooled over the attention mask like
+    the sentence-transformers model. Prefers model_quantized.onnx over
+    model.onnx when both are present in the directory.
+    """
+
+    def __init__(self, model_dir, max_length=ONNX_MAX_SEQ_LENGTH):
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, sentences, normalize_embeddings=False, batch_size=32):
+        """Encode sentences to float32 vectors (SentenceTransformer.encode subset)."""
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding="max_length",
+                max_length=self.max_length,
+                truncation=True,
+                return_tensors="np",
+            )
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(pooled.astype(np.float32))
+
+        vectors = np.concatenate(outputs) if outputs else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        return vectors
+
+
+def export_onnx_encoder(directory, quantize=True):
+    """One-time export of all-MiniLM-L6-v2 to ONNX for HS_ONNX_MODEL_DIR.
+
+    Needs optimum[onnxruntime]. With quantize=True the weights are also
+    dynamically quantized to int8 (written as model_quantized.onnx).
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    model = ORTModelForFeatureExtraction.from_pretrained(
+        "sentence-transformers/all-MiniLM-L6-v2", export=True
+    )
+    model.save_pretrained(directory)
+    AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2").save_pretrained(directory)
+
+    if quantize:
+        quantizer = ORTQuantizer.from_pretrained(directory)
+        quantizer.quantize(
+            save_dir=directory,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False),
+        )
+
 
 def get_embedding_model():
     """Get or create the embedding model singleton."""
     global _embedding_model
     if _embedding_model is None:
-        _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        if HS_ONNX_MODEL_DIR and onnx_available:
+            _embedding_model = OnnxEncoder(HS_ONNX_MODEL_DIR)
+        else:
+            if HS_ONNX_MODEL_DIR:
+                print("⚠️  onnxruntime/transformers not installed, using sentence-transformers")
+            from sentence_transformers import SentenceTransformer
+            _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
     return _embedding_model
 
 
+def _encode_worker():
+    """Pull queued queries, encode them in batches and resolve their futures."""
+    while True:
+        batch = [_encode_queue.get()]
+        # A lone query is encoded at once; only linger when others are queued
+        deadline = time.monotonic() + (0.0 if _encode_queue.empty() else ENCODE_MAX_WAIT_SECONDS)
+        while len(batch) < ENCODE_MAX_BATCH:
+            try:
+                batch.append(_encode_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+
+        try:
+            model = get_embedding_model()
+            vectors = model.encode([text for text, _ in batch], normalize_embeddings=True,
+                                   batch_size=ENCODE_MAX_BATCH)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(np.asarray(vector, dtype=np.float32))
+
+
+def encode_query(text):
+    """Encode one query to a unit-length float32 vector via the shared batcher."""
+    global _encode_thread
+    if _encode_thread is None or not _encode_thread.is_alive():
+        with _encode_thread_lock:
+            if _encode_thread is None or not _encode_thread.is_alive():
+                _encode_thread = threading.Thread(target=_encode_worker, name="hs-encoder", daemon=True)
+                _encode_thread.start()
+
+    future = Future()
+    _encode_queue.put((text, future))
+    try:
+        return future.result(timeout=ENCODE_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        print(f"⚠️  HS encoder batcher did not answer in {ENCODE_TIMEOUT_SECONDS}s, encoding directly")
+        vector = get_embedding_model().encode([text], normalize_embeddings=True)[0]
+        return np.asarray(vector, dtype=np.float32)
+
+
+def _hs_matrix(hs_entries):
+    """Stack the entries' embeddings into a row-normalized (N, D) float32 matrix."""
+    cache = _hs_matrix_cache
+    if cache["entries"] is not hs_entries or cache["size"] != len(hs_entries):
+        matrix = np.asarray([entry["embedding"] for entry in hs_entries], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        cache["matrix"] = matrix / norms
+        cache["int8"] = None
+        cache["faiss"] = None
+        cache["entries"] = hs_entries
+        cache["size"] = len(hs_entries)
+    return cache["matrix"]
+
+
+def build_faiss_index(matrix):
+    """Train an inner-product IVF-PQ index over a row-normalized matrix.
+
+    Returns None when faiss is not installed or there are too few rows to
+    train the coarse quantizer.
+    """
+    if not faiss_available or len(matrix) < FAISS_MIN_TRAIN:
+        return None
+
+    vectors = np.ascontiguousarray(matrix, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], FAISS_INDEX_FACTORY, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = FAISS_NPROBE
+    return index
+
+
+def save_hs_index(hs_entries, directory):
+    """Persist HS entries for load_hs_index().
+
+    Writes hs_embeddings.npy (row-normalized float32, shape (N, D)) plus
+    hs_htsno.npy and hs_desc.npy string arrays in the same row order.
+    With HS_FAISS_INDEX set, an IVF-PQ index over the same rows is also
+    written to hs.faiss.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = _hs_matrix(hs_entries)
+    np.save(os.path.join(directory, "hs_embeddings.npy"), matrix)
+    np.save(os.path.join(directory, "hs_htsno.npy"),
+            np.asarray([entry["htsno"] or "" for entry in hs_entries], dtype=str))
+    np.save(os.path.join(directory, "hs_desc.npy"),
+            np.asarray([entry["description"] for entry in hs_entries], dtype=str))
+
+    if HS_FAISS_INDEX:
+        index = build_faiss_index(matrix)
+        if index is not None:
+            faiss.write_index(index, os.path.join(directory, "hs.faiss"))
+            _hs_matrix_cache["faiss"] = index
+
+
+def load_hs_index(directory):
+    """Load entries written by save_hs_index(), or return None if absent.
+
+    The embedding matrix is memory-mapped and installed as the cached
+    matrix for the returned entries, so classify_hs scores against it
+    directly without stacking or normalizing anything.
+    """
+    paths = [os.path.join(directory, name) for name in ("hs_embeddings.npy", "hs_htsno.npy", "hs_desc.npy")]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+
+    matrix = np.load(paths[0], mmap_mode="r")
+    htsnos = np.load(paths[1])
+    descriptions = np.load(paths[2])
+
+    hs_entries = [
+        {"htsno": str(htsno), "description": str(description), "embedding": matrix[i]}
+        for i, (htsno, description) in enumerate(zip(htsnos, descriptions))
+    ]
+
+    index = None
+    index_path = os.path.join(directory, "hs.faiss")
+    if HS_FAISS_INDEX and faiss_available and os.path.exists(index_path):
+        index = faiss.read_index(index_path)
+        index.nprobe = FAISS_NPROBE
+
+    _hs_matrix_cache.update(entries=hs_entries, size=len(hs_entries), matrix=matrix, int8=None, faiss=index)
+    return hs_entries
+
+
+def quantize_int8(matrix):
+    """Symmetric per-row int8 quantization.
+
+    Returns (values, scales) with values int8 and matrix ~= values * scales[:, None].
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    values = np.round(matrix / scales[:, None]).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+def _hs_matrix_int8(hs_entries):
+    """int8 quantization of _hs_matrix(), cached alongside it."""
+    matrix = _hs_matrix(hs_entries)
+    cache = _hs_matrix_cache
+    if cache["int8"] is None:
+        cache["int8"] = quantize_int8(matrix)
+    return cache["int8"]
+
+
+def _similarities(hs_entries, query):
+    """Cosine similarity of a unit-length query against every HS entry."""
+    if not HS_EMBEDDINGS_INT8:
+        return _hs_matrix(hs_entries) @ query
+
+    values, scales = _hs_matrix_int8(hs_entries)
+    q_values, q_scale = quantize_int8(query)
+    q = q_values[0].astype(np.float32)
+
+    # Only the int8 matrix streams from memory: each block is widened to
+    # float32 while cache-resident and scored with a BLAS matrix-vector
+    # product. int8 products sum exactly in float32 while D * 127**2 < 2**24
+    # (D <= 1040); past that the rounding is far below the quantization error.
+    dots = np.empty(len(values), dtype=np.float32)
+    for start in range(0, len(values), INT8_BLOCK_ROWS):
+        block = values[start:start + INT8_BLOCK_ROWS]
+        np.dot(block.astype(np.float32), q, out=dots[start:start + len(block)])
+    return dots * (scales * q_scale[0])
+
+
 def classify_hs(product_description, hs_entries, top_n=5):
     """Classify product description to HS codes using semantic similarity."""
-    model = get_embedding_model()
+    if not hs_entries or top_n <= 0:
+        return []
+
+    # Generate a unit-length embedding for input
+    desc_embedding = encode_query(product_description)
 
-    # Generate embedding for input
-    desc_embedding = model.encode([product_description])[0]
+    if HS_FAISS_INDEX:
+        _hs_matrix(hs_entries)
+        index = _hs_matrix_cache["faiss"]
+        if index is not None:
+            scores, ids = index.search(desc_embedding[None, :], min(top_n, len(hs_entries)))
+            return [
+                (hs_entries[i]["htsno"], hs_entries[i]["description"], float(score))
+                for i, score in zip(ids[0], scores[0]) if i >= 0
+            ]
 
-    # Compute cosine similarity with all HS descriptions
-    similarities = []
-    for entry in hs_entries:
-        sim = cosine_similarity(
-            np.array(desc_embedding).reshape(1, -1),
-            np.array(entry["embedding"]).reshape(1, -1)
-        )[0][0]
-        similarities.append((entry["htsno"], entry["description"], sim))
+    # Cosine similarity with all HS descriptions in one matrix-vector product
+    similarities = _similarities(hs_entries, desc_embedding)
 
-    # Sort by similarity
-    similarities.sort(key=lambda x: x[2], reverse=True)
+    # Select the top N without sorting every entry
+    top_n = min(top_n, len(similarities))
+    top = np.argpartition(-similarities, top_n - 1)[:top_n]
+    top = top[np.argsort(-similarities[top])]
 
-    # Return top N
-    return similarities[:top_n]
+    return [
+        (hs_entries[i]["htsno"], hs_entries[i]["description"], float(similarities[i]))
+        for i in top
+    ]
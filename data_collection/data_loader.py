@@ -2,14 +2,56 @@
 # Data Loading Module
 # -----------------------------
 
-import json
+import os
+import orjson
 from config import hts_json_path
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+# Columnar copy of the HTS JSON written by convert_hts_to_parquet()
+hts_parquet_path = os.path.splitext(hts_json_path)[0] + ".parquet"
+
+
+def _parquet_is_current():
+    """True when the parquet copy exists and is not older than the JSON."""
+    if not pyarrow_available or not os.path.exists(hts_parquet_path):
+        return False
+    if not os.path.exists(hts_json_path):
+        return True
+    return os.path.getmtime(hts_parquet_path) >= os.path.getmtime(hts_json_path)
+
+
+def convert_hts_to_parquet():
+    """One-time conversion of the HTS JSON to zstd-compressed parquet."""
+    with open(hts_json_path, "rb") as f:
+        hts_data = orjson.loads(f.read())
+
+    table = pa.table({
+        "htsno": [item.get("htsno") for item in hts_data],
+        "description": [item.get("description", "") for item in hts_data],
+    })
+    pq.write_table(table, hts_parquet_path, compression="zstd")
+
 
 def load_hts_data():
     """Load and preprocess HTS data."""
-    with open(hts_json_path, "r", encoding="utf-8") as f:
-        hts_data = json.load(f)
+    if _parquet_is_current():
+        # Only the two needed columns are read, straight from the mapped file
+        table = pq.read_table(hts_parquet_path, columns=["htsno", "description"], memory_map=True)
+        return [
+            {"htsno": htsno, "description": description}
+            for htsno, description in zip(table.column("htsno").to_pylist(),
+                                          table.column("description").to_pylist())
+            if description
+        ]
+
+    with open(hts_json_path, "rb") as f:
+        hts_data = orjson.loads(f.read())
 
     # Extract HS codes and descriptions
     hs_entries = [
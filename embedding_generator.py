@@ -2,6 +2,7 @@
 # Embedding Generation Module
 # -----------------------------
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
@@ -14,10 +15,11 @@ def generate_embeddings(hs_entries, model_name='all-MiniLM-L6-v2'):
     print("Generating embeddings for all HS descriptions... (may take some time)")
 
     descriptions = [entry["description"] for entry in hs_entries]
-    embeddings = model.encode(descriptions, show_progress_bar=True)
+    embeddings = np.asarray(model.encode(descriptions, show_progress_bar=True), dtype=np.float32)
 
+    # Keep float32 rows rather than Python lists so they stack without conversion
     for entry, embedding in zip(hs_entries, embeddings):
-        entry["embedding"] = embedding.tolist()
+        entry["embedding"] = embedding
 
     print("Embeddings ready!")
     return hs_entries
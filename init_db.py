@@ -3,7 +3,10 @@ Database Initialization and Seeding Script
 Creates tables and populates with sample data for CRM/ERP system
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
 from crm_app import app, db
 from models import (
     User, UserRole, Company, CompanyType, Contact, Lead, LeadStatus,
@@ -13,180 +16,219 @@ from models import (
     ExchangeRate
 )
 
+# Payment reference prefixes, built once rather than per seeded payment
+_WIRE = "WIRE-"
+_WIRE_PARTIAL = "WIRE-PARTIAL-"
+
+
+def reset_schema():
+    """Drop and recreate every table in a single transaction
+
+    Postgres drops the whole public schema in one statement and SQLite drops
+    the known tables without reflecting each one first; either way the
+    tables are then created without per-table existence checks.
+    """
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('DROP SCHEMA public CASCADE; CREATE SCHEMA public;'))
+        elif conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            for table in reversed(db.metadata.sorted_tables):
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{table.name}"')
+        else:
+            db.metadata.drop_all(conn)
+        db.metadata.create_all(conn, checkfirst=False)
+
+
+def bulk_create(model, rows):
+    """Insert all rows in one executemany and return them, ids included, in input order
+
+    The result is plain Row tuples rather than ORM instances, so reading
+    `.id` after a commit does not trigger a refresh SELECT.
+    """
+    table = model.__table__
+
+    # executemany needs the same keys in every row: optional columns a row
+    # leaves out (and that have no default) are sent as NULL
+    blank = {
+        key: None for key in set().union(*rows)
+        if table.c[key].default is None and table.c[key].server_default is None
+    }
+    rows = [{**blank, **row} for row in rows]
+
+    return db.session.execute(
+        insert(table).returning(*table.c, sort_by_parameter_order=True),
+        rows
+    ).all()
+
+
+_USERS_DATA = (
+    {
+        'email': 'admin@example.com',
+        'username': 'admin',
+        'password': 'Admin123!',
+        'first_name': 'Admin',
+        'last_name': 'User',
+        'role': UserRole.ADMIN,
+        'phone': '+1-555-0100'
+    },
+    {
+        'email': 'admin@tradepro.com',
+        'username': 'admin_tradepro',
+        'password': 'Admin123!',
+        'first_name': 'Trade',
+        'last_name': 'Administrator',
+        'role': UserRole.ADMIN,
+        'phone': '+1-555-0100'
+    },
+    {
+        'email': 'manager@tradepro.com',
+        'username': 'manager',
+        'password': 'Manager123!',
+        'first_name': 'Sarah',
+        'last_name': 'Manager',
+        'role': UserRole.MANAGER,
+        'phone': '+1-555-0101'
+    },
+    {
+        'email': 'sales@tradepro.com',
+        'username': 'sales',
+        'password': 'Sales123!',
+        'first_name': 'John',
+        'last_name': 'Sales',
+        'role': UserRole.SALES,
+        'phone': '+1-555-0102'
+    },
+    {
+        'email': 'ops@tradepro.com',
+        'username': 'operations',
+        'password': 'Ops123!',
+        'first_name': 'Mike',
+        'last_name': 'Operations',
+        'role': UserRole.OPERATIONS,
+        'phone': '+1-555-0103'
+    },
+    {
+        'email': 'finance@tradepro.com',
+        'username': 'finance',
+        'password': 'Finance123!',
+        'first_name': 'Emma',
+        'last_name': 'Finance',
+        'role': UserRole.FINANCE,
+        'phone': '+1-555-0104'
+    }
+)
+
 
 def create_users():
     """Create sample users with different roles"""
     print("Creating users...")
 
-    users_data = [
-        {
-            'email': 'admin@example.com',
-            'username': 'admin',
-            'password': 'Admin123!',
-            'first_name': 'Admin',
-            'last_name': 'User',
-            'role': UserRole.ADMIN,
-            'phone': '+1-555-0100'
-        },
-        {
-            'email': 'admin@tradepro.com',
-            'username': 'admin_tradepro',
-            'password': 'Admin123!',
-            'first_name': 'Trade',
-            'last_name': 'Administrator',
-            'role': UserRole.ADMIN,
-            'phone': '+1-555-0100'
-        },
-        {
-            'email': 'manager@tradepro.com',
-            'username': 'manager',
-            'password': 'Manager123!',
-            'first_name': 'Sarah',
-            'last_name': 'Manager',
-            'role': UserRole.MANAGER,
-            'phone': '+1-555-0101'
-        },
-        {
-            'email': 'sales@tradepro.com',
-            'username': 'sales',
-            'password': 'Sales123!',
-            'first_name': 'John',
-            'last_name': 'Sales',
-            'role': UserRole.SALES,
-            'phone': '+1-555-0102'
-        },
-        {
-            'email': 'ops@tradepro.com',
-            'username': 'operations',
-            'password': 'Ops123!',
-            'first_name': 'Mike',
-            'last_name': 'Operations',
-            'role': UserRole.OPERATIONS,
-            'phone': '+1-555-0103'
-        },
-        {
-            'email': 'finance@tradepro.com',
-            'username': 'finance',
-            'password': 'Finance123!',
-            'first_name': 'Emma',
-            'last_name': 'Finance',
-            'role': UserRole.FINANCE,
-            'phone': '+1-555-0104'
-        }
-    ]
+    # Hash up front so the insert itself is a single batch. hashlib releases
+    # the GIL inside scrypt/pbkdf2, so the hashes are computed in parallel.
+    rows = [dict(user_data) for user_data in _USERS_DATA]
+    with ThreadPoolExecutor() as executor:
+        hashes = executor.map(generate_password_hash, [row.pop('password') for row in rows])
+        for row, password_hash in zip(rows, hashes):
+            row['password_hash'] = password_hash
 
-    users = []
-    for user_data in users_data:
-        user = User(
-            email=user_data['email'],
-            username=user_data['username'],
-            first_name=user_data['first_name'],
-            last_name=user_data['last_name'],
-            role=user_data['role'],
-            phone=user_data['phone']
-        )
-        user.set_password(user_data['password'])
-        db.session.add(user)
-        users.append(user)
+    users = bulk_create(User, rows)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(users)} users")
     return users
 
 
+_COMPANIES_DATA = (
+    {
+        'name': 'Global Electronics Inc',
+        'legal_name': 'Global Electronics Incorporated',
+        'company_type': CompanyType.CUSTOMER,
+        'tax_id': '12-3456789',
+        'email': 'info@globalelectronics.com',
+        'phone': '+1-555-1000',
+        'address_line1': '123 Tech Drive',
+        'city': 'San Francisco',
+        'state': 'CA',
+        'postal_code': '94105',
+        'country': 'USA',
+        'industry': 'Electronics',
+        'payment_terms': 'Net 30',
+        'credit_limit': 500000.00
+    },
+    {
+        'name': 'Pacific Traders Ltd',
+        'legal_name': 'Pacific Traders Limited',
+        'company_type': CompanyType.SUPPLIER,
+        'tax_id': '98-7654321',
+        'email': 'contact@pacifictraders.com',
+        'phone': '+86-21-5555-0001',
+        'address_line1': '456 Harbor Road',
+        'city': 'Shanghai',
+        'state': 'Shanghai',
+        'postal_code': '200000',
+        'country': 'China',
+        'industry': 'Manufacturing',
+        'payment_terms': 'Net 60'
+    },
+    {
+        'name': 'European Distribution GmbH',
+        'legal_name': 'European Distribution GmbH',
+        'company_type': CompanyType.BOTH,
+        'tax_id': 'DE123456789',
+        'email': 'info@eudist.de',
+        'phone': '+49-30-5555-0002',
+        'address_line1': '789 Commerce Strasse',
+        'city': 'Berlin',
+        'state': 'Berlin',
+        'postal_code': '10115',
+        'country': 'Germany',
+        'industry': 'Distribution',
+        'payment_terms': 'Net 45',
+        'credit_limit': 750000.00
+    },
+    {
+        'name': 'Tokyo Imports Corp',
+        'legal_name': 'Tokyo Imports Corporation',
+        'company_type': CompanyType.CUSTOMER,
+        'tax_id': 'JP-1234567890',
+        'email': 'sales@tokyoimports.jp',
+        'phone': '+81-3-5555-0003',
+        'address_line1': '321 Business District',
+        'city': 'Tokyo',
+        'state': 'Tokyo',
+        'postal_code': '100-0001',
+        'country': 'Japan',
+        'industry': 'Import/Export',
+        'payment_terms': 'Net 30',
+        'credit_limit': 350000.00
+    },
+    {
+        'name': 'Dubai Trading House',
+        'legal_name': 'Dubai Trading House LLC',
+        'company_type': CompanyType.CUSTOMER,
+        'tax_id': 'AE-987654321',
+        'email': 'info@dubaitrading.ae',
+        'phone': '+971-4-5555-0004',
+        'address_line1': '555 Trade Center',
+        'city': 'Dubai',
+        'state': 'Dubai',
+        'postal_code': '12345',
+        'country': 'UAE',
+        'industry': 'Trading',
+        'payment_terms': 'Net 15',
+        'credit_limit': 600000.00
+    }
+)
+
+
 def create_companies():
     """Create sample companies"""
     print("Creating companies...")
 
-    companies_data = [
-        {
-            'name': 'Global Electronics Inc',
-            'legal_name': 'Global Electronics Incorporated',
-            'company_type': CompanyType.CUSTOMER,
-            'tax_id': '12-3456789',
-            'email': 'info@globalelectronics.com',
-            'phone': '+1-555-1000',
-            'address_line1': '123 Tech Drive',
-            'city': 'San Francisco',
-            'state': 'CA',
-            'postal_code': '94105',
-            'country': 'USA',
-            'industry': 'Electronics',
-            'payment_terms': 'Net 30',
-            'credit_limit': 500000.00
-        },
-        {
-            'name': 'Pacific Traders Ltd',
-            'legal_name': 'Pacific Traders Limited',
-            'company_type': CompanyType.SUPPLIER,
-            'tax_id': '98-7654321',
-            'email': 'contact@pacifictraders.com',
-            'phone': '+86-21-5555-0001',
-            'address_line1': '456 Harbor Road',
-            'city': 'Shanghai',
-            'state': 'Shanghai',
-            'postal_code': '200000',
-            'country': 'China',
-            'industry': 'Manufacturing',
-            'payment_terms': 'Net 60'
-        },
-        {
-            'name': 'European Distribution GmbH',
-            'legal_name': 'European Distribution GmbH',
-            'company_type': CompanyType.BOTH,
-            'tax_id': 'DE123456789',
-            'email': 'info@eudist.de',
-            'phone': '+49-30-5555-0002',
-            'address_line1': '789 Commerce Strasse',
-            'city': 'Berlin',
-            'state': 'Berlin',
-            'postal_code': '10115',
-            'country': 'Germany',
-            'industry': 'Distribution',
-            'payment_terms': 'Net 45',
-            'credit_limit': 750000.00
-        },
-        {
-            'name': 'Tokyo Imports Corp',
-            'legal_name': 'Tokyo Imports Corporation',
-            'company_type': CompanyType.CUSTOMER,
-            'tax_id': 'JP-1234567890',
-            'email': 'sales@tokyoimports.jp',
-            'phone': '+81-3-5555-0003',
-            'address_line1': '321 Business District',
-            'city': 'Tokyo',
-            'state': 'Tokyo',
-            'postal_code': '100-0001',
-            'country': 'Japan',
-            'industry': 'Import/Export',
-            'payment_terms': 'Net 30',
-            'credit_limit': 350000.00
-        },
-        {
-            'name': 'Dubai Trading House',
-            'legal_name': 'Dubai Trading House LLC',
-            'company_type': CompanyType.CUSTOMER,
-            'tax_id': 'AE-987654321',
-            'email': 'info@dubaitrading.ae',
-            'phone': '+971-4-5555-0004',
-            'address_line1': '555 Trade Center',
-            'city': 'Dubai',
-            'state': 'Dubai',
-            'postal_code': '12345',
-            'country': 'UAE',
-            'industry': 'Trading',
-            'payment_terms': 'Net 15',
-            'credit_limit': 600000.00
-        }
-    ]
-
-    companies = []
-    for company_data in companies_data:
-        company = Company(**company_data)
-        db.session.add(company)
-        companies.append(company)
+    companies = bulk_create(Company, _COMPANIES_DATA)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(companies)} companies")
     return companies
 
@@ -195,190 +237,181 @@ def create_contacts(companies):
     """Create sample contacts"""
     print("Creating contacts...")
 
-    contacts = []
+    contacts_data = [
+        # Global Electronics contacts
+        {
+            'company_id': companies[0].id,
+            'first_name': 'Robert',
+            'last_name': 'Chen',
+            'title': 'Purchasing Manager',
+            'department': 'Procurement',
+            'email': 'r.chen@globalelectronics.com',
+            'phone': '+1-555-1001',
+            'is_primary': True
+        },
+        # Pacific Traders contacts
+        {
+            'company_id': companies[1].id,
+            'first_name': 'Li',
+            'last_name': 'Wang',
+            'title': 'Sales Director',
+            'department': 'Sales',
+            'email': 'l.wang@pacifictraders.com',
+            'phone': '+86-21-5555-0011',
+            'is_primary': True
+        },
+        # European Distribution contacts
+        {
+            'company_id': companies[2].id,
+            'first_name': 'Anna',
+            'last_name': 'Schmidt',
+            'title': 'Supply Chain Manager',
+            'department': 'Operations',
+            'email': 'a.schmidt@eudist.de',
+            'phone': '+49-30-5555-0012',
+            'is_primary': True
+        }
+    ]
+
+    contacts = bulk_create(Contact, contacts_data)
 
-    # Global Electronics contacts
-    contacts.append(Contact(
-        company_id=companies[0].id,
-        first_name='Robert',
-        last_name='Chen',
-        title='Purchasing Manager',
-        department='Procurement',
-        email='r.chen@globalelectronics.com',
-        phone='+1-555-1001',
-        is_primary=True
-    ))
-
-    # Pacific Traders contacts
-    contacts.append(Contact(
-        company_id=companies[1].id,
-        first_name='Li',
-        last_name='Wang',
-        title='Sales Director',
-        department='Sales',
-        email='l.wang@pacifictraders.com',
-        phone='+86-21-5555-0011',
-        is_primary=True
-    ))
-
-    # European Distribution contacts
-    contacts.append(Contact(
-        company_id=companies[2].id,
-        first_name='Anna',
-        last_name='Schmidt',
-        title='Supply Chain Manager',
-        department='Operations',
-        email='a.schmidt@eudist.de',
-        phone='+49-30-5555-0012',
-        is_primary=True
-    ))
-
-    for contact in contacts:
-        db.session.add(contact)
-
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(contacts)} contacts")
     return contacts
 
 
+_PRODUCTS_DATA = (
+    {
+        'sku': 'ELEC-001',
+        'name': 'Wireless Bluetooth Headphones',
+        'description': 'Premium noise-canceling wireless headphones',
+        'hs_code': '8518300000',
+        'category': 'Electronics',
+        'unit_price': 149.99,
+        'currency': 'USD',
+        'unit_of_measure': 'pcs',
+        'weight': 0.25,
+        'weight_unit': 'kg',
+        'origin_country': 'China',
+        'manufacturer': 'TechSound',
+        'brand': 'TechSound Pro'
+    },
+    {
+        'sku': 'ELEC-002',
+        'name': 'Smartphone 5G',
+        'description': 'Latest generation 5G smartphone',
+        'hs_code': '8517120000',
+        'category': 'Electronics',
+        'unit_price': 899.99,
+        'currency': 'USD',
+        'unit_of_measure': 'pcs',
+        'weight': 0.19,
+        'weight_unit': 'kg',
+        'origin_country': 'Korea',
+        'manufacturer': 'MobileTech',
+        'brand': 'MobileTech X'
+    },
+    {
+        'sku': 'ELEC-003',
+        'name': 'Laptop Computer',
+        'description': 'Business laptop with 16GB RAM',
+        'hs_code': '8471300000',
+        'category': 'Electronics',
+        'unit_price': 1299.99,
+        'currency': 'USD',
+        'unit_of_measure': 'pcs',
+        'weight': 1.8,
+        'weight_unit': 'kg',
+        'origin_country': 'Taiwan',
+        'manufacturer': 'ComputerPro',
+        'brand': 'ComputerPro Elite'
+    },
+    {
+        'sku': 'ACC-001',
+        'name': 'USB-C Cable',
+        'description': 'High-speed USB-C charging cable',
+        'hs_code': '8544421000',
+        'category': 'Accessories',
+        'unit_price': 19.99,
+        'currency': 'USD',
+        'unit_of_measure': 'pcs',
+        'weight': 0.05,
+        'weight_unit': 'kg',
+        'origin_country': 'China',
+        'manufacturer': 'CableWorks'
+    },
+    {
+        'sku': 'ACC-002',
+        'name': 'Wireless Mouse',
+        'description': 'Ergonomic wireless mouse',
+        'hs_code': '8471607100',
+        'category': 'Accessories',
+        'unit_price': 39.99,
+        'currency': 'USD',
+        'unit_of_measure': 'pcs',
+        'weight': 0.12,
+        'weight_unit': 'kg',
+        'origin_country': 'China',
+        'manufacturer': 'InputDevices'
+    }
+)
+
+
 def create_products():
     """Create sample products"""
     print("Creating products...")
 
-    products_data = [
-        {
-            'sku': 'ELEC-001',
-            'name': 'Wireless Bluetooth Headphones',
-            'description': 'Premium noise-canceling wireless headphones',
-            'hs_code': '8518300000',
-            'category': 'Electronics',
-            'unit_price': 149.99,
-            'currency': 'USD',
-            'unit_of_measure': 'pcs',
-            'weight': 0.25,
-            'weight_unit': 'kg',
-            'origin_country': 'China',
-            'manufacturer': 'TechSound',
-            'brand': 'TechSound Pro'
-        },
-        {
-            'sku': 'ELEC-002',
-            'name': 'Smartphone 5G',
-            'description': 'Latest generation 5G smartphone',
-            'hs_code': '8517120000',
-            'category': 'Electronics',
-            'unit_price': 899.99,
-            'currency': 'USD',
-            'unit_of_measure': 'pcs',
-            'weight': 0.19,
-            'weight_unit': 'kg',
-            'origin_country': 'Korea',
-            'manufacturer': 'MobileTech',
-            'brand': 'MobileTech X'
-        },
-        {
-            'sku': 'ELEC-003',
-            'name': 'Laptop Computer',
-            'description': 'Business laptop with 16GB RAM',
-            'hs_code': '8471300000',
-            'category': 'Electronics',
-            'unit_price': 1299.99,
-            'currency': 'USD',
-            'unit_of_measure': 'pcs',
-            'weight': 1.8,
-            'weight_unit': 'kg',
-            'origin_country': 'Taiwan',
-            'manufacturer': 'ComputerPro',
-            'brand': 'ComputerPro Elite'
-        },
-        {
-            'sku': 'ACC-001',
-            'name': 'USB-C Cable',
-            'description': 'High-speed USB-C charging cable',
-            'hs_code': '8544421000',
-            'category': 'Accessories',
-            'unit_price': 19.99,
-            'currency': 'USD',
-            'unit_of_measure': 'pcs',
-            'weight': 0.05,
-            'weight_unit': 'kg',
-            'origin_country': 'China',
-            'manufacturer': 'CableWorks'
-        },
-        {
-            'sku': 'ACC-002',
-            'name': 'Wireless Mouse',
-            'description': 'Ergonomic wireless mouse',
-            'hs_code': '8471607100',
-            'category': 'Accessories',
-            'unit_price': 39.99,
-            'currency': 'USD',
-            'unit_of_measure': 'pcs',
-            'weight': 0.12,
-            'weight_unit': 'kg',
-            'origin_country': 'China',
-            'manufacturer': 'InputDevices'
-        }
-    ]
-
-    products = []
-    for product_data in products_data:
-        product = Product(**product_data)
-        db.session.add(product)
-        products.append(product)
+    products = bulk_create(Product, _PRODUCTS_DATA)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(products)} products")
     return products
 
 
+_WAREHOUSES_DATA = (
+    {
+        'name': 'US West Coast Warehouse',
+        'code': 'WH-US-001',
+        'address_line1': '1000 Logistics Way',
+        'city': 'Los Angeles',
+        'state': 'CA',
+        'postal_code': '90001',
+        'country': 'USA',
+        'manager_name': 'David Johnson',
+        'phone': '+1-555-2000'
+    },
+    {
+        'name': 'Shanghai Distribution Center',
+        'code': 'WH-CN-001',
+        'address_line1': '200 Warehouse Road',
+        'city': 'Shanghai',
+        'state': 'Shanghai',
+        'postal_code': '201100',
+        'country': 'China',
+        'manager_name': 'Zhang Wei',
+        'phone': '+86-21-5555-2001'
+    },
+    {
+        'name': 'European Hub',
+        'code': 'WH-DE-001',
+        'address_line1': '50 Lagerstrasse',
+        'city': 'Hamburg',
+        'state': 'Hamburg',
+        'postal_code': '20095',
+        'country': 'Germany',
+        'manager_name': 'Klaus Mueller',
+        'phone': '+49-40-5555-2002'
+    }
+)
+
+
 def create_warehouses():
     """Create sample warehouses"""
     print("Creating warehouses...")
 
-    warehouses_data = [
-        {
-            'name': 'US West Coast Warehouse',
-            'code': 'WH-US-001',
-            'address_line1': '1000 Logistics Way',
-            'city': 'Los Angeles',
-            'state': 'CA',
-            'postal_code': '90001',
-            'country': 'USA',
-            'manager_name': 'David Johnson',
-            'phone': '+1-555-2000'
-        },
-        {
-            'name': 'Shanghai Distribution Center',
-            'code': 'WH-CN-001',
-            'address_line1': '200 Warehouse Road',
-            'city': 'Shanghai',
-            'state': 'Shanghai',
-            'postal_code': '201100',
-            'country': 'China',
-            'manager_name': 'Zhang Wei',
-            'phone': '+86-21-5555-2001'
-        },
-        {
-            'name': 'European Hub',
-            'code': 'WH-DE-001',
-            'address_line1': '50 Lagerstrasse',
-            'city': 'Hamburg',
-            'state': 'Hamburg',
-            'postal_code': '20095',
-            'country': 'Germany',
-            'manager_name': 'Klaus Mueller',
-            'phone': '+49-40-5555-2002'
-        }
-    ]
-
-    warehouses = []
-    for warehouse_data in warehouses_data:
-        warehouse = Warehouse(**warehouse_data)
-        db.session.add(warehouse)
-        warehouses.append(warehouse)
+    warehouses = bulk_create(Warehouse, _WAREHOUSES_DATA)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(warehouses)} warehouses")
     return warehouses
 
@@ -387,24 +420,26 @@ def create_inventory(products, warehouses):
     """Create sample inventory"""
     print("Creating inventory...")
 
-    inventory_items = []
+    now = datetime.utcnow()
 
     # Add inventory for each product in each warehouse
-    for warehouse in warehouses:
-        for product in products:
-            item = InventoryItem(
-                product_id=product.id,
-                warehouse_id=warehouse.id,
-                quantity_available=100 + (product.id * 10),
-                quantity_reserved=5,
-                quantity_on_order=20,
-                location=f'A{product.id}-B{warehouse.id}',
-                last_counted_at=datetime.utcnow()
-            )
-            db.session.add(item)
-            inventory_items.append(item)
-
-    db.session.commit()
+    inventory_rows = [
+        {
+            'product_id': product.id,
+            'warehouse_id': warehouse.id,
+            'quantity_available': 100 + (product.id * 10),
+            'quantity_reserved': 5,
+            'quantity_on_order': 20,
+            'location': f'A{product.id}-B{warehouse.id}',
+            'last_counted_at': now
+        }
+        for warehouse in warehouses
+        for product in products
+    ]
+
+    inventory_items = bulk_create(InventoryItem, inventory_rows)
+
+    db.session.flush()
     print(f"✅ Created {len(inventory_items)} inventory items")
     return inventory_items
 
@@ -413,14 +448,16 @@ def create_orders(companies, products, users):
     """Create sample orders"""
     print("Creating orders...")
 
+    today = date.today()
+    today_str = datetime.now().strftime('%Y%m%d')
     orders = []
 
     # Order 1 - Confirmed
     order1 = Order(
-        order_number=f"ORD-{datetime.now().strftime('%Y%m%d')}-001",
+        order_number=f"ORD-{today_str}-001",
         company_id=companies[0].id,
         status=OrderStatus.CONFIRMED,
-        order_date=date.today() - timedelta(days=5),
+        order_date=today - timedelta(days=5),
         currency='USD',
         payment_status=PaymentStatus.PENDING,
         payment_terms='Net 30',
@@ -435,34 +472,26 @@ def create_orders(companies, products, users):
     )
 
     # Add items to order 1
-    item1 = OrderItem(
-        product_id=products[0].id,
-        quantity=50,
-        unit_price=149.99,
-        line_total=50 * 149.99
-    )
-    item2 = OrderItem(
-        product_id=products[3].id,
-        quantity=100,
-        unit_price=19.99,
-        line_total=100 * 19.99
-    )
-    order1.items.extend([item1, item2])
+    order1_items = [
+        {'product_id': products[0].id, 'quantity': 50, 'unit_price': 149.99},
+        {'product_id': products[3].id, 'quantity': 100, 'unit_price': 19.99}
+    ]
 
-    order1.subtotal = sum([item.line_total for item in order1.items])
-    order1.tax_amount = order1.subtotal * 0.08
-    order1.shipping_cost = 150.00
-    order1.total_amount = order1.subtotal + order1.tax_amount + order1.shipping_cost
+    order1.set_totals(
+        (OrderItem.compute_line_total(item['quantity'], item['unit_price']) for item in order1_items),
+        tax_rate=0.08,
+        shipping_cost=150.00
+    )
 
     orders.append(order1)
     db.session.add(order1)
 
     # Order 2 - In Production
     order2 = Order(
-        order_number=f"ORD-{datetime.now().strftime('%Y%m%d')}-002",
+        order_number=f"ORD-{today_str}-002",
         company_id=companies[2].id,
         status=OrderStatus.IN_PRODUCTION,
-        order_date=date.today() - timedelta(days=3),
+        order_date=today - timedelta(days=3),
         currency='EUR',
         payment_status=PaymentStatus.PARTIAL,
         payment_terms='Net 45',
@@ -475,28 +504,25 @@ def create_orders(companies, products, users):
         sales_person=users[2].id
     )
 
-    item3 = OrderItem(
-        product_id=products[1].id,
-        quantity=30,
-        unit_price=899.99,
-        line_total=30 * 899.99
-    )
-    order2.items.append(item3)
+    order2_items = [
+        {'product_id': products[1].id, 'quantity': 30, 'unit_price': 899.99}
+    ]
 
-    order2.subtotal = sum([item.line_total for item in order2.items])
-    order2.tax_amount = order2.subtotal * 0.19
-    order2.shipping_cost = 250.00
-    order2.total_amount = order2.subtotal + order2.tax_amount + order2.shipping_cost
+    order2.set_totals(
+        (OrderItem.compute_line_total(item['quantity'], item['unit_price']) for item in order2_items),
+        tax_rate=0.19,
+        shipping_cost=250.00
+    )
 
     orders.append(order2)
     db.session.add(order2)
 
     # Order 3 - Shipped
     order3 = Order(
-        order_number=f"ORD-{datetime.now().strftime('%Y%m%d')}-003",
+        order_number=f"ORD-{today_str}-003",
         company_id=companies[3].id,
         status=OrderStatus.SHIPPED,
-        order_date=date.today() - timedelta(days=10),
+        order_date=today - timedelta(days=10),
         currency='JPY',
         payment_status=PaymentStatus.PAID,
         payment_terms='Net 30',
@@ -509,23 +535,29 @@ def create_orders(companies, products, users):
         sales_person=users[2].id
     )
 
-    item4 = OrderItem(
-        product_id=products[2].id,
-        quantity=25,
-        unit_price=1299.99,
-        line_total=25 * 1299.99
-    )
-    order3.items.append(item4)
+    order3_items = [
+        {'product_id': products[2].id, 'quantity': 25, 'unit_price': 1299.99}
+    ]
 
-    order3.subtotal = sum([item.line_total for item in order3.items])
-    order3.tax_amount = order3.subtotal * 0.10
-    order3.shipping_cost = 300.00
-    order3.total_amount = order3.subtotal + order3.tax_amount + order3.shipping_cost
+    order3.set_totals(
+        (OrderItem.compute_line_total(item['quantity'], item['unit_price']) for item in order3_items),
+        tax_rate=0.10,
+        shipping_cost=300.00
+    )
 
     orders.append(order3)
     db.session.add(order3)
 
-    db.session.commit()
+    # Insert every order's items in one batch once the order ids are assigned
+    db.session.flush()
+    item_rows = [
+        dict(item, order_id=order.id)
+        for order, items in zip(orders, (order1_items, order2_items, order3_items))
+        for item in items
+    ]
+    db.session.execute(insert(OrderItem), item_rows)
+
+    db.session.flush()
     print(f"✅ Created {len(orders)} orders")
     return orders
 
@@ -535,10 +567,12 @@ def create_invoices(orders):
     print("Creating invoices...")
 
     invoices = []
+    payments = []
 
     for order in orders:
         invoice = Invoice(
-            invoice_number=f"INV-{order.order_number.replace('ORD', '')}",
+            # order_number always starts with "ORD", so slice it off instead of replace()
+            invoice_number="INV-" + order.order_number[3:],
             company_id=order.company_id,
             order_id=order.id,
             invoice_date=order.order_date + timedelta(days=1),
@@ -552,30 +586,36 @@ def create_invoices(orders):
 
         # Add payments for paid invoices
         if order.payment_status == PaymentStatus.PAID:
-            payment = Payment(
-                amount=invoice.total_amount,
-                payment_date=invoice.due_date - timedelta(days=5),
-                payment_method=PaymentMethod.WIRE_TRANSFER,
-                reference_number=f"WIRE-{invoice.invoice_number}",
-                notes='Payment received via bank transfer'
-            )
-            invoice.payments.append(payment)
+            payments.append((invoice, {
+                'amount': invoice.total_amount,
+                'payment_date': invoice.due_date - timedelta(days=5),
+                'payment_method': PaymentMethod.WIRE_TRANSFER,
+                'reference_number': _WIRE + invoice.invoice_number,
+                'notes': 'Payment received via bank transfer'
+            }))
             invoice.amount_paid = invoice.total_amount
 
         elif order.payment_status == PaymentStatus.PARTIAL:
-            payment = Payment(
-                amount=invoice.total_amount / 2,
-                payment_date=invoice.invoice_date + timedelta(days=15),
-                payment_method=PaymentMethod.WIRE_TRANSFER,
-                reference_number=f"WIRE-PARTIAL-{invoice.invoice_number}"
-            )
-            invoice.payments.append(payment)
+            payments.append((invoice, {
+                'amount': invoice.total_amount / 2,
+                'payment_date': invoice.invoice_date + timedelta(days=15),
+                'payment_method': PaymentMethod.WIRE_TRANSFER,
+                'reference_number': _WIRE_PARTIAL + invoice.invoice_number
+            }))
             invoice.amount_paid = invoice.total_amount / 2
 
         invoices.append(invoice)
         db.session.add(invoice)
 
-    db.session.commit()
+    # Insert all payments in one batch once the invoice ids are assigned
+    db.session.flush()
+    if payments:
+        db.session.execute(
+            insert(Payment),
+            [dict(row, invoice_id=invoice.id) for invoice, row in payments]
+        )
+
+    db.session.flush()
     print(f"✅ Created {len(invoices)} invoices")
     return invoices
 
@@ -584,6 +624,12 @@ def create_shipments(orders):
     """Create sample shipments"""
     print("Creating shipments...")
 
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    tracking_events = [
+        {'date': '2024-01-15T10:00:00', 'status': 'Picked up', 'location': 'Los Angeles, CA'},
+        {'date': '2024-01-16T14:30:00', 'status': 'In transit', 'location': 'Memphis, TN'},
+        {'date': '2024-01-17T08:15:00', 'status': 'Customs clearance', 'location': 'Tokyo, Japan'}
+    ]
     shipments = []
 
     # Only create shipments for shipped orders
@@ -591,7 +637,7 @@ def create_shipments(orders):
 
     for order in shipped_orders:
         shipment = Shipment(
-            tracking_number=f"FEDEX-{datetime.now().strftime('%Y%m%d%H%M%S')}-{order.id}",
+            tracking_number=f"FEDEX-{timestamp}-{order.id}",
             order_id=order.id,
             company_id=order.company_id,
             status=ShipmentStatus.IN_TRANSIT,
@@ -613,16 +659,12 @@ def create_shipments(orders):
             number_of_packages=3,
             shipping_cost=order.shipping_cost,
             incoterm=order.incoterm,
-            tracking_events=[
-                {'date': '2024-01-15T10:00:00', 'status': 'Picked up', 'location': 'Los Angeles, CA'},
-                {'date': '2024-01-16T14:30:00', 'status': 'In transit', 'location': 'Memphis, TN'},
-                {'date': '2024-01-17T08:15:00', 'status': 'Customs clearance', 'location': 'Tokyo, Japan'}
-            ]
+            tracking_events=tracking_events
         )
         shipments.append(shipment)
         db.session.add(shipment)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(shipments)} shipments")
     return shipments
 
@@ -631,6 +673,7 @@ def create_leads(companies, users):
     """Create sample leads"""
     print("Creating leads...")
 
+    today = date.today()
     leads_data = [
         {
             'company_id': companies[0].id,
@@ -640,7 +683,7 @@ def create_leads(companies, users):
             'source': 'Trade Show',
             'estimated_value': 250000.00,
             'probability': 75,
-            'expected_close_date': date.today() + timedelta(days=45),
+            'expected_close_date': today + timedelta(days=45),
             'assigned_to': users[2].id,
             'contact_name': 'Robert Chen',
             'contact_email': 'r.chen@globalelectronics.com'
@@ -652,20 +695,16 @@ def create_leads(companies, users):
             'source': 'Website',
             'estimated_value': 75000.00,
             'probability': 25,
-            'expected_close_date': date.today() + timedelta(days=60),
+            'expected_close_date': today + timedelta(days=60),
             'assigned_to': users[2].id,
             'contact_name': 'Jane Smith',
             'contact_email': 'jane@techstartup.com'
         }
     ]
 
-    leads = []
-    for lead_data in leads_data:
-        lead = Lead(**lead_data)
-        db.session.add(lead)
-        leads.append(lead)
+    leads = bulk_create(Lead, leads_data)
 
-    db.session.commit()
+    db.session.flush()
     print(f"✅ Created {len(leads)} leads")
     return leads
 
@@ -678,23 +717,27 @@ def init_database():
 
     with app.app_context():
         # Drop all tables and recreate
-        print("Dropping existing tables...")
-        db.drop_all()
-        print("Creating new tables...")
-        db.create_all()
+        print("Recreating tables...")
+        reset_schema()
         print("✅ Database schema created\n")
 
-        # Create sample data
-        users = create_users()
-        companies = create_companies()
-        contacts = create_contacts(companies)
-        products = create_products()
-        warehouses = create_warehouses()
-        inventory = create_inventory(products, warehouses)
-        orders = create_orders(companies, products, users)
-        invoices = create_invoices(orders)
-        shipments = create_shipments(orders)
-        leads = create_leads(companies, users)
+        # Create sample data in one transaction: each stage only flushes
+        # (ids are assigned) and everything is committed once at the end
+        try:
+            users = create_users()
+            companies = create_companies()
+            contacts = create_contacts(companies)
+            products = create_products()
+            warehouses = create_warehouses()
+            inventory = create_inventory(products, warehouses)
+            orders = create_orders(companies, products, users)
+            invoices = create_invoices(orders)
+            shipments = create_shipments(orders)
+            leads = create_leads(companies, users)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
         print("\n" + "="*80)
         print("DATABASE INITIALIZATION COMPLETE!")
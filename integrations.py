@@ -3,22 +3,85 @@ Third-Party Integration Services for Global Trade CRM/ERP
 Payment processors, Shipping carriers, Email, Exchange rates, etc.
 """
 
+import asyncio
+import itertools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+import numpy as np
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional
 import stripe
-from forex_python.converter import CurrencyRates, RatesNotAvailableError
+
+# Rates API (ECB reference rates); one request returns every rate for a base
+EXCHANGE_RATE_API_URL = os.getenv('EXCHANGE_RATE_API_URL', 'https://api.frankfurter.app')
+EXCHANGE_RATE_REFRESH_SECONDS = int(os.getenv('EXCHANGE_RATE_REFRESH_SECONDS', 3600))
+
+# Payment credentials, read from the environment once at import
+_STRIPE_KEY = os.getenv('STRIPE_SECRET_KEY')
+_PAYPAL_CLIENT_ID = os.getenv('PAYPAL_CLIENT_ID')
+_PAYPAL_CLIENT_SECRET = os.getenv('PAYPAL_CLIENT_SECRET')
+_PAYPAL_BASE_URL = os.getenv('PAYPAL_BASE_URL', 'https://api-m.sandbox.paypal.com')
+
+# Upper bound on a single carrier's rate quote when quoting all carriers
+CARRIER_RATE_TIMEOUT_SECONDS = float(os.getenv('CARRIER_RATE_TIMEOUT_SECONDS', 10))
+
+# Background threads delivering queued emails (SMTP round-trips block)
+EMAIL_SEND_WORKERS = int(os.getenv('EMAIL_SEND_WORKERS', 4))
+
+# Sequence for placeholder tracking/message ids. next() on a count is atomic
+# under the GIL, so ids never collide even within the same nanosecond
+_ID_COUNTER = itertools.count()
+
+
+def _unique_id(prefix: str) -> str:
+    """Collision-free id like 'FEDEX-17f3a9c2e4b10000-2a'"""
+    return f"{prefix}-{time.time_ns():x}-{next(_ID_COUNTER):x}"
 
 
 # ============================================================================
 # PAYMENT INTEGRATIONS
 # ============================================================================
 
+class PaymentResult:
+    """Outcome of PaymentProcessor.process_payment (fixed slots, no per-result dict)"""
+    __slots__ = ('success', 'transaction_id', 'status', 'amount', 'currency',
+                 'created_at', 'error', 'error_type')
+
+    def __init__(self, success: bool, transaction_id: Optional[str] = None,
+                 status: Optional[str] = None, amount: Optional[float] = None,
+                 currency: Optional[str] = None, created_at: Optional[str] = None,
+                 error: Optional[str] = None, error_type: Optional[str] = None):
+        self.success = success
+        self.transaction_id = transaction_id
+        self.status = status
+        self.amount = amount
+        self.currency = currency
+        self.created_at = created_at
+        self.error = error
+        self.error_type = error_type
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'PaymentResult({fields})'
+
+    def to_dict(self) -> dict:
+        """JSON-ready dict with the same keys the processors used to return"""
+        return {
+            name: getattr(self, name) for name in self.__slots__
+            if name == 'success' or getattr(self, name) is not None
+        }
+
+
 class PaymentProcessor:
     """Base class for payment processors"""
 
-    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> dict:
+    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> PaymentResult:
         raise NotImplementedError
 
     def refund_payment(self, transaction_id: str, amount: float = None) -> dict:
@@ -32,11 +95,67 @@ class StripePaymentProcessor(PaymentProcessor):
     """Stripe payment integration"""
 
     def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv('STRIPE_SECRET_KEY')
+        self.api_key = api_key or _STRIPE_KEY
         if self.api_key:
             stripe.api_key = self.api_key
 
-    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> dict:
+    @staticmethod
+    def _payment_intent_params(amount: float, currency: str, payment_method: str, metadata: dict) -> dict:
+        return {
+            'amount': int(amount * 100),  # Convert to cents
+            'currency': currency.lower(),
+            'payment_method': payment_method,
+            'confirm': True,
+            'metadata': metadata,
+            'automatic_payment_methods': {'enabled': True, 'allow_redirects': 'never'}
+        }
+
+    @staticmethod
+    def _payment_result(intent, amount: float, currency: str) -> PaymentResult:
+        return PaymentResult(
+            success=True,
+            transaction_id=intent.id,
+            status=intent.status,
+            amount=amount,
+            currency=currency,
+            created_at=datetime.fromtimestamp(intent.created).isoformat()
+        )
+
+    @staticmethod
+    def _payment_error(e: Exception) -> PaymentResult:
+        return PaymentResult(
+            success=False,
+            error=str(e),
+            error_type='card_error' if isinstance(e, stripe.error.CardError) else 'stripe_error'
+        )
+
+    @staticmethod
+    def _refund_params(transaction_id: str, amount: float = None) -> dict:
+        refund_params = {'payment_intent': transaction_id}
+        if amount:
+            refund_params['amount'] = int(amount * 100)
+        return refund_params
+
+    @staticmethod
+    def _refund_result(refund) -> dict:
+        return {
+            'success': True,
+            'refund_id': refund.id,
+            'status': refund.status,
+            'amount': refund.amount / 100
+        }
+
+    @staticmethod
+    def _status_result(intent) -> dict:
+        return {
+            'success': True,
+            'transaction_id': intent.id,
+            'status': intent.status,
+            'amount': intent.amount / 100,
+            'currency': intent.currency.upper()
+        }
+
+    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> PaymentResult:
         """
         Process payment through Stripe
         amount: in smallest currency unit (cents for USD)
@@ -44,51 +163,18 @@ class StripePaymentProcessor(PaymentProcessor):
         try:
             # Create payment intent
             intent = stripe.PaymentIntent.create(
-                amount=int(amount * 100),  # Convert to cents
-                currency=currency.lower(),
-                payment_method=payment_method,
-                confirm=True,
-                metadata=metadata,
-                automatic_payment_methods={'enabled': True, 'allow_redirects': 'never'}
+                **self._payment_intent_params(amount, currency, payment_method, metadata)
             )
+            return self._payment_result(intent, amount, currency)
 
-            return {
-                'success': True,
-                'transaction_id': intent.id,
-                'status': intent.status,
-                'amount': amount,
-                'currency': currency,
-                'created_at': datetime.fromtimestamp(intent.created).isoformat()
-            }
-
-        except stripe.error.CardError as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'error_type': 'card_error'
-            }
         except stripe.error.StripeError as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'error_type': 'stripe_error'
-            }
+            return self._payment_error(e)
 
     def refund_payment(self, transaction_id: str, amount: float = None) -> dict:
         """Refund a payment"""
         try:
-            refund_params = {'payment_intent': transaction_id}
-            if amount:
-                refund_params['amount'] = int(amount * 100)
-
-            refund = stripe.Refund.create(**refund_params)
-
-            return {
-                'success': True,
-                'refund_id': refund.id,
-                'status': refund.status,
-                'amount': refund.amount / 100
-            }
+            refund = stripe.Refund.create(**self._refund_params(transaction_id, amount))
+            return self._refund_result(refund)
 
         except stripe.error.StripeError as e:
             return {
@@ -100,14 +186,7 @@ class StripePaymentProcessor(PaymentProcessor):
         """Get payment status"""
         try:
             intent = stripe.PaymentIntent.retrieve(transaction_id)
-
-            return {
-                'success': True,
-                'transaction_id': intent.id,
-                'status': intent.status,
-                'amount': intent.amount / 100,
-                'currency': intent.currency.upper()
-            }
+            return self._status_result(intent)
 
         except stripe.error.StripeError as e:
             return {
@@ -137,21 +216,71 @@ class StripePaymentProcessor(PaymentProcessor):
             }
 
 
+class AsyncStripePaymentProcessor(StripePaymentProcessor):
+    """Stripe integration with asyncio variants for batch work
+
+    Uses the Stripe SDK's *_async calls, so many requests can be in flight
+    at once, e.g. when reconciling or charging a batch of invoices. Results
+    have the same shape as the synchronous methods.
+    """
+
+    async def process_payment_async(self, amount: float, currency: str, payment_method: str,
+                                    metadata: dict) -> PaymentResult:
+        try:
+            intent = await stripe.PaymentIntent.create_async(
+                **self._payment_intent_params(amount, currency, payment_method, metadata)
+            )
+            return self._payment_result(intent, amount, currency)
+        except stripe.error.StripeError as e:
+            return self._payment_error(e)
+
+    async def refund_payment_async(self, transaction_id: str, amount: float = None) -> dict:
+        try:
+            refund = await stripe.Refund.create_async(**self._refund_params(transaction_id, amount))
+            return self._refund_result(refund)
+        except stripe.error.StripeError as e:
+            return {'success': False, 'error': str(e)}
+
+    async def get_payment_status_async(self, transaction_id: str) -> dict:
+        try:
+            intent = await stripe.PaymentIntent.retrieve_async(transaction_id)
+            return self._status_result(intent)
+        except stripe.error.StripeError as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_payment_statuses(self, transaction_ids: List[str]) -> List[dict]:
+        """Fetch the status of many payments concurrently, in input order"""
+        async def gather_statuses():
+            return await asyncio.gather(*(self.get_payment_status_async(t) for t in transaction_ids))
+
+        return list(asyncio.run(gather_statuses()))
+
+
 class PayPalPaymentProcessor(PaymentProcessor):
     """PayPal payment integration (placeholder for implementation)"""
 
     def __init__(self, client_id: str = None, client_secret: str = None):
-        self.client_id = client_id or os.getenv('PAYPAL_CLIENT_ID')
-        self.client_secret = client_secret or os.getenv('PAYPAL_CLIENT_SECRET')
-        self.base_url = os.getenv('PAYPAL_BASE_URL', 'https://api-m.sandbox.paypal.com')
+        self.client_id = client_id or _PAYPAL_CLIENT_ID
+        self.client_secret = client_secret or _PAYPAL_CLIENT_SECRET
+        self.base_url = _PAYPAL_BASE_URL
+
+        # Keep-alive connections to PayPal, reused across calls
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+        self._access_token = None
+        self._token_expires_at = 0.0
 
     def get_access_token(self) -> str:
-        """Get PayPal OAuth access token"""
+        """Get PayPal OAuth access token, reusing it until shortly before expiry"""
+        if self._access_token and time.monotonic() < self._token_expires_at:
+            return self._access_token
+
         auth = (self.client_id, self.client_secret)
         headers = {'Accept': 'application/json', 'Accept-Language': 'en_US'}
         data = {'grant_type': 'client_credentials'}
 
-        response = requests.post(
+        response = self._session.post(
             f'{self.base_url}/v1/oauth2/token',
             auth=auth,
             headers=headers,
@@ -159,12 +288,16 @@ class PayPalPaymentProcessor(PaymentProcessor):
         )
 
         if response.status_code == 200:
-            return response.json().get('access_token')
+            payload = response.json()
+            self._access_token = payload.get('access_token')
+            # Refresh a minute early so a token never expires mid-request
+            self._token_expires_at = time.monotonic() + max(int(payload.get('expires_in', 0)) - 60, 0)
+            return self._access_token
         return None
 
-    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> dict:
+    def process_payment(self, amount: float, currency: str, payment_method: str, metadata: dict) -> PaymentResult:
         # Implementation would go here
-        return {'success': False, 'error': 'PayPal integration not fully implemented'}
+        return PaymentResult(success=False, error='PayPal integration not fully implemented')
 
 
 # ============================================================================
@@ -172,7 +305,30 @@ class PayPalPaymentProcessor(PaymentProcessor):
 # ============================================================================
 
 class ShippingCarrier:
-    """Base class for shipping carriers"""
+    """Base class for shipping carriers
+
+    Subclasses set api_key/account_number/base_url and then call
+    super().__init__(), which opens the carrier's pooled keep-alive session.
+    """
+
+    def __init__(self):
+        # One session per carrier (carriers are long-lived via ShippingService),
+        # so rate/track/label calls reuse TLS connections instead of reconnecting
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'TradeCRM-Integrations/1.0'
+        if self.api_key:
+            self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+
+    def close(self):
+        """Release the carrier's pooled connections"""
+        self.session.close()
 
     def create_shipment(self, shipment_data: dict) -> dict:
         raise NotImplementedError
@@ -183,6 +339,11 @@ class ShippingCarrier:
     def get_rates(self, origin: dict, destination: dict, packages: list) -> list:
         raise NotImplementedError
 
+    async def get_rates_async(self, origin: dict, destination: dict, packages: list) -> list:
+        """Awaitable get_rates; runs the blocking session call in a worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_rates, origin, destination, packages)
+
     def cancel_shipment(self, tracking_number: str) -> dict:
         raise NotImplementedError
 
@@ -194,13 +355,14 @@ class FedExCarrier(ShippingCarrier):
         self.api_key = api_key or os.getenv('FEDEX_API_KEY')
         self.account_number = account_number or os.getenv('FEDEX_ACCOUNT_NUMBER')
         self.base_url = 'https://apis.fedex.com'
+        super().__init__()
 
     def create_shipment(self, shipment_data: dict) -> dict:
         """Create FedEx shipment"""
         # This is a simplified example - actual FedEx API requires OAuth and more complex data structure
         return {
             'success': True,
-            'tracking_number': f"FEDEX-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'tracking_number': _unique_id('FEDEX'),
             'label_url': 'https://example.com/label.pdf',
             'carrier': 'FedEx'
         }
@@ -247,11 +409,12 @@ class UPSCarrier(ShippingCarrier):
         self.api_key = api_key or os.getenv('UPS_API_KEY')
         self.account_number = account_number or os.getenv('UPS_ACCOUNT_NUMBER')
         self.base_url = 'https://onlinetools.ups.com/api'
+        super().__init__()
 
     def create_shipment(self, shipment_data: dict) -> dict:
         return {
             'success': True,
-            'tracking_number': f"UPS-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'tracking_number': _unique_id('UPS'),
             'label_url': 'https://example.com/label.pdf',
             'carrier': 'UPS'
         }
@@ -282,11 +445,12 @@ class DHLCarrier(ShippingCarrier):
         self.api_key = api_key or os.getenv('DHL_API_KEY')
         self.account_number = account_number or os.getenv('DHL_ACCOUNT_NUMBER')
         self.base_url = 'https://api.dhl.com'
+        super().__init__()
 
     def create_shipment(self, shipment_data: dict) -> dict:
         return {
             'success': True,
-            'tracking_number': f"DHL-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'tracking_number': _unique_id('DHL'),
             'label_url': 'https://example.com/label.pdf',
             'carrier': 'DHL'
         }
@@ -325,18 +489,49 @@ class ShippingService:
         return self.carriers.get(carrier_name.lower())
 
     def get_all_rates(self, origin: dict, destination: dict, packages: list) -> dict:
-        """Get rates from all carriers"""
-        all_rates = {}
+        """Get rates from all carriers concurrently"""
+        # Carrier rate lookups are independent HTTP round-trips, so they are
+        # issued in parallel and the quote takes max(latency) instead of sum.
+        # The pool belongs to this call and has a worker per carrier, so every
+        # lookup starts at once and never queues behind other requests.
+        pool = ThreadPoolExecutor(max_workers=len(self.carriers), thread_name_prefix='carrier-rates')
+        try:
+            futures = {
+                carrier_name: pool.submit(carrier.get_rates, origin, destination, packages)
+                for carrier_name, carrier in self.carriers.items()
+            }
+        finally:
+            # Don't block on carriers that miss the deadline; their threads
+            # exit on their own once the lookup returns
+            pool.shutdown(wait=False)
 
-        for carrier_name, carrier in self.carriers.items():
+        # One shared deadline, so slow carriers don't add up their timeouts
+        deadline = time.monotonic() + CARRIER_RATE_TIMEOUT_SECONDS
+        all_rates = {}
+        for carrier_name, future in futures.items():
             try:
-                rates = carrier.get_rates(origin, destination, packages)
-                all_rates[carrier_name] = rates
+                all_rates[carrier_name] = future.result(timeout=max(deadline - time.monotonic(), 0))
             except Exception as e:
-                all_rates[carrier_name] = {'error': str(e)}
+                all_rates[carrier_name] = {'error': str(e) or type(e).__name__}
 
         return all_rates
 
+    async def get_all_rates_async(self, origin: dict, destination: dict, packages: list) -> dict:
+        """get_all_rates for async callers: carriers are awaited together"""
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(carrier.get_rates_async(origin, destination, packages),
+                                 CARRIER_RATE_TIMEOUT_SECONDS)
+                for carrier in self.carriers.values()
+            ),
+            return_exceptions=True
+        )
+        return {
+            carrier_name: {'error': str(result) or type(result).__name__}
+            if isinstance(result, Exception) else result
+            for carrier_name, result in zip(self.carriers, results)
+        }
+
     def create_shipment(self, carrier_name: str, shipment_data: dict) -> dict:
         """Create shipment with specified carrier"""
         carrier = self.get_carrier(carrier_name)
@@ -357,39 +552,121 @@ class ShippingService:
 # ============================================================================
 
 class ExchangeRateService:
-    """Currency conversion and exchange rate management"""
+    """Currency conversion and exchange rate management
 
-    def __init__(self):
-        self.currency_rates = CurrencyRates()
+    Rates for a base currency are fetched in a single request and kept for
+    EXCHANGE_RATE_REFRESH_SECONDS (historical dates indefinitely); lookups
+    and conversions are then served from that snapshot without network I/O.
+    """
+
+    CACHE_MAX_SIZE = 32
+
+    def __init__(self, api_url: str = None, refresh_seconds: int = None,
+                 on_refresh: Callable[[str, dict, Optional[str]], None] = None):
+        self.api_url = (api_url or EXCHANGE_RATE_API_URL).rstrip('/')
+        self.refresh_seconds = refresh_seconds or EXCHANGE_RATE_REFRESH_SECONDS
         self.base_currency = 'USD'
+        # Called as on_refresh(base, rates, rate_date) after each fresh fetch
+        self.on_refresh = on_refresh
+        self.session = requests.Session()
+        self._rates_cache = {}
+        self._fetch_lock = threading.Lock()
+        self._matrix = None
+
+    def _cached_rates(self, key) -> Optional[dict]:
+        entry = self._rates_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _get_rates(self, base: str, date_obj: date = None) -> dict:
+        """All rates for `base` (on `date_obj`), or {} if unavailable"""
+        key = (base, date_obj)
+        rates = self._cached_rates(key)
+        if rates is not None:
+            return rates
+
+        # Cache hits never wait; concurrent misses make a single request
+        with self._fetch_lock:
+            rates = self._cached_rates(key)
+            if rates is not None:
+                return rates
+
+            path = date_obj.isoformat() if date_obj else 'latest'
+            try:
+                response = self.session.get(f'{self.api_url}/{path}', params={'base': base}, timeout=10)
+                response.raise_for_status()
+                payload = response.json()
+                rates = {code: float(rate) for code, rate in payload.get('rates', {}).items()}
+            except (requests.RequestException, ValueError, AttributeError):
+                return {}
+
+            if not rates:
+                return {}
+
+            # Rates for a past date never change
+            expires = float('inf') if date_obj else time.monotonic() + self.refresh_seconds
+            if len(self._rates_cache) >= self.CACHE_MAX_SIZE:
+                self._rates_cache.clear()
+            self._rates_cache[key] = (expires, rates)
+
+        if self.on_refresh:
+            self.on_refresh(base, rates, payload.get('date'))
+        return rates
 
     def get_rate(self, from_currency: str, to_currency: str, date_obj: date = None) -> Optional[float]:
         """Get exchange rate between two currencies"""
-        try:
-            if date_obj:
-                rate = self.currency_rates.get_rate(from_currency, to_currency, date_obj)
-            else:
-                rate = self.currency_rates.get_rate(from_currency, to_currency)
-            return rate
-        except RatesNotAvailableError:
-            return None
+        if from_currency == to_currency:
+            return 1.0
+        return self._get_rates(from_currency, date_obj).get(to_currency)
 
     def convert(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
         """Convert amount from one currency to another"""
-        try:
-            converted = self.currency_rates.convert(from_currency, to_currency, amount)
-            return round(converted, 2)
-        except RatesNotAvailableError:
+        rate = self.get_rate(from_currency, to_currency)
+        if rate is None:
+            return None
+        return round(amount * rate, 2)
+
+    def convert_many(self, amounts, from_currency: str, to_currency: str) -> Optional[np.ndarray]:
+        """Convert many amounts in one currency pair with a single rate lookup
+
+        Mixed source currencies go through convert_batch() instead.
+        """
+        rate = self.get_rate(from_currency, to_currency)
+        if rate is None:
             return None
+        return np.round(np.asarray(amounts, dtype=np.float64) * rate, 2)
 
     def get_all_rates(self, base_currency: str = None) -> dict:
         """Get all exchange rates for a base currency"""
         base = base_currency or self.base_currency
-        try:
-            rates = self.currency_rates.get_rates(base)
-            return rates
-        except RatesNotAvailableError:
-            return {}
+        return dict(self._get_rates(base))
+
+    def _rate_matrix(self):
+        """(index, matrix) where matrix[index[a], index[b]] is the a -> b rate
+
+        Cross rates are derived from the base-currency snapshot and rebuilt
+        only when that snapshot is refreshed. The extra last row and column
+        are NaN and stand in for any currency the snapshot does not have.
+        """
+        rates = self._get_rates(self.base_currency)
+        if self._matrix is not None and self._matrix[0] is rates:
+            return self._matrix[1], self._matrix[2]
+
+        codes = [self.base_currency, *(code for code in rates if code != self.base_currency)]
+        per_base = np.array([1.0] + [rates[code] for code in codes[1:]] + [np.nan])
+        index = {code: i for i, code in enumerate(codes)}
+        matrix = per_base[np.newaxis, :] / per_base[:, np.newaxis]
+        self._matrix = (rates, index, matrix)
+        return index, matrix
+
+    def convert_batch(self, amounts, from_currencies, to_currencies) -> np.ndarray:
+        """Convert many amounts at once; unknown currencies give NaN"""
+        index, matrix = self._rate_matrix()
+        unknown = len(matrix) - 1
+        from_idx = np.fromiter((index.get(code, unknown) for code in from_currencies), dtype=np.intp)
+        to_idx = np.fromiter((index.get(code, unknown) for code in to_currencies), dtype=np.intp)
+        return np.round(np.asarray(amounts, dtype=np.float64) * matrix[from_idx, to_idx], 2)
 
     def get_supported_currencies(self) -> list:
         """Get list of supported currencies"""
@@ -406,6 +683,9 @@ class ExchangeRateService:
 class EmailService:
     """Email sending and template management"""
 
+    # Recent deliveries kept for delivery_result(), oldest dropped first
+    DELIVERY_HISTORY_SIZE = 1000
+
     def __init__(self, smtp_server: str = None, smtp_port: int = None,
                  username: str = None, password: str = None):
         self.smtp_server = smtp_server or os.getenv('SMTP_SERVER', 'smtp.gmail.com')
@@ -413,27 +693,76 @@ class EmailService:
         self.username = username or os.getenv('SMTP_USERNAME')
         self.password = password or os.getenv('SMTP_PASSWORD')
         self.from_email = os.getenv('FROM_EMAIL', self.username)
+        self._executor = ThreadPoolExecutor(max_workers=EMAIL_SEND_WORKERS, thread_name_prefix='email-send')
+        self._deliveries = {}
+        self._deliveries_lock = threading.Lock()
 
     def send_email(self, to_email: str, subject: str, body: str,
                    html_body: str = None, attachments: list = None) -> dict:
-        """Send email"""
+        """Queue an email for background delivery and return immediately
+
+        Use delivery_result(message_id) to wait for the outcome.
+        """
+        message_id = _unique_id('MSG')
+        future = self._executor.submit(
+            self._send_email_sync, message_id, to_email, subject, body, html_body, attachments
+        )
+        future.add_done_callback(self._log_send_failure)
+        with self._deliveries_lock:
+            if len(self._deliveries) >= self.DELIVERY_HISTORY_SIZE:
+                del self._deliveries[next(iter(self._deliveries))]
+            self._deliveries[message_id] = future
+        return {
+            'success': True,
+            'message_id': message_id,
+            'to': to_email,
+            'subject': subject
+        }
+
+    def delivery_result(self, message_id: str, timeout: float = None) -> Optional[dict]:
+        """Delivery result of a queued email, waiting up to `timeout` seconds
+
+        Returns None if `message_id` is unknown or no longer tracked; raises
+        the delivery error if sending failed.
+        """
+        with self._deliveries_lock:
+            future = self._deliveries.get(message_id)
+        if future is None:
+            return None
+        return future.result(timeout=timeout)
+
+    def _send_email_sync(self, message_id: str, to_email: str, subject: str, body: str,
+                         html_body: str = None, attachments: list = None) -> dict:
+        """Deliver one email (runs on the email executor)"""
         # This is a placeholder - actual implementation would use smtplib or flask-mail
         return {
             'success': True,
-            'message_id': f"MSG-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'message_id': message_id,
             'to': to_email,
             'subject': subject
         }
 
+    @staticmethod
+    def _log_send_failure(future) -> None:
+        error = future.exception()
+        if error is not None:
+            print(f"❌ Email delivery failed: {error}")
+
+    def close(self):
+        """Deliver the emails still queued, then stop the workers"""
+        self._executor.shutdown(wait=True)
+
     def send_order_confirmation(self, order_data: dict, customer_email: str) -> dict:
         """Send order confirmation email"""
-        subject = f"Order Confirmation - {order_data.get('order_number')}"
+        # f-strings are compiled with the module; each field is looked up once
+        order_number = order_data.get('order_number')
+        subject = f"Order Confirmation - {order_number}"
         body = f"""
         Dear Customer,
 
         Thank you for your order!
 
-        Order Number: {order_data.get('order_number')}
+        Order Number: {order_number}
         Order Date: {order_data.get('order_date')}
         Total Amount: {order_data.get('total_amount')} {order_data.get('currency')}
 
@@ -447,13 +776,14 @@ class EmailService:
 
     def send_shipment_notification(self, shipment_data: dict, customer_email: str) -> dict:
         """Send shipment notification"""
-        subject = f"Your order has shipped - Tracking: {shipment_data.get('tracking_number')}"
+        tracking_number = shipment_data.get('tracking_number')
+        subject = f"Your order has shipped - Tracking: {tracking_number}"
         body = f"""
         Dear Customer,
 
         Your order has been shipped!
 
-        Tracking Number: {shipment_data.get('tracking_number')}
+        Tracking Number: {tracking_number}
         Carrier: {shipment_data.get('carrier')}
         Expected Delivery: {shipment_data.get('estimated_delivery_date')}
 
@@ -470,6 +800,28 @@ class EmailService:
 # CUSTOMS & TARIFF SERVICE
 # ============================================================================
 
+# Example duty rates (simplified), keyed by HS prefix: a chapter/heading
+# (4 digits) or a more specific subheading (6-10 digits)
+_DUTY_RATES = MappingProxyType({
+    '8518': 0.025,  # 2.5% for audio equipment
+    '6203': 0.162,  # 16.2% for men's clothing
+    # ... more rates
+})
+# Prefix lengths present in the table, longest first, for longest-prefix match
+_DUTY_PREFIX_LENGTHS = tuple(sorted({len(prefix) for prefix in _DUTY_RATES}, reverse=True))
+DEFAULT_DUTY_RATE = 0.05
+
+
+def _duty_rate(hs_code: str) -> float:
+    """Rate of the most specific table prefix of hs_code (dots ignored)"""
+    digits = hs_code.replace('.', '')
+    for length in _DUTY_PREFIX_LENGTHS:
+        rate = _DUTY_RATES.get(digits[:length])
+        if rate is not None:
+            return rate
+    return DEFAULT_DUTY_RATE
+
+
 class CustomsService:
     """Customs and tariff calculation service"""
 
@@ -478,16 +830,7 @@ class CustomsService:
         """Calculate customs duty"""
         # This is a placeholder - actual implementation would integrate with
         # customs databases or APIs like Avalara, Zonos, etc.
-
-        # Example duty rates (simplified)
-        duty_rates = {
-            '8518': 0.025,  # 2.5% for audio equipment
-            '6203': 0.162,  # 16.2% for men's clothing
-            # ... more rates
-        }
-
-        hs_prefix = hs_code[:4] if len(hs_code) >= 4 else hs_code
-        duty_rate = duty_rates.get(hs_prefix, 0.05)  # Default 5%
+        duty_rate = _duty_rate(hs_code)
 
         duty_amount = value * duty_rate
 
@@ -541,44 +884,55 @@ class IntegrationFactory:
     """Factory to get integration service instances"""
 
     _instances = {}
+    # Guards _key_locks; each key then has its own lock so building one slow
+    # service never blocks another
+    _lock = threading.Lock()
+    _key_locks: Dict[str, threading.Lock] = {}
+
+    _payment_processors = {
+        'stripe': StripePaymentProcessor,
+        'stripe_async': AsyncStripePaymentProcessor,
+        'paypal': PayPalPaymentProcessor,
+    }
+
+    @classmethod
+    def _get_or_create(cls, key: str, factory: Callable):
+        """Return the shared instance for key, constructing it exactly once"""
+        instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in cls._instances:
+                cls._instances[key] = factory()
+            return cls._instances[key]
 
     @classmethod
     def get_payment_processor(cls, processor_type: str = 'stripe') -> PaymentProcessor:
         """Get payment processor instance"""
-        if processor_type not in cls._instances:
-            if processor_type == 'stripe':
-                cls._instances[processor_type] = StripePaymentProcessor()
-            elif processor_type == 'paypal':
-                cls._instances[processor_type] = PayPalPaymentProcessor()
-            else:
-                raise ValueError(f"Unknown payment processor: {processor_type}")
-
-        return cls._instances[processor_type]
+        processor_class = cls._payment_processors.get(processor_type)
+        if processor_class is None:
+            raise ValueError(f"Unknown payment processor: {processor_type}")
+        return cls._get_or_create(processor_type, processor_class)
 
     @classmethod
     def get_shipping_service(cls) -> ShippingService:
         """Get shipping service instance"""
-        if 'shipping' not in cls._instances:
-            cls._instances['shipping'] = ShippingService()
-        return cls._instances['shipping']
+        return cls._get_or_create('shipping', ShippingService)
 
     @classmethod
     def get_exchange_rate_service(cls) -> ExchangeRateService:
         """Get exchange rate service instance"""
-        if 'exchange_rate' not in cls._instances:
-            cls._instances['exchange_rate'] = ExchangeRateService()
-        return cls._instances['exchange_rate']
+        return cls._get_or_create('exchange_rate', ExchangeRateService)
 
     @classmethod
     def get_email_service(cls) -> EmailService:
         """Get email service instance"""
-        if 'email' not in cls._instances:
-            cls._instances['email'] = EmailService()
-        return cls._instances['email']
+        return cls._get_or_create('email', EmailService)
 
     @classmethod
     def get_customs_service(cls) -> CustomsService:
         """Get customs service instance"""
-        if 'customs' not in cls._instances:
-            cls._instances['customs'] = CustomsService()
-        return cls._instances['customs']
+        return cls._get_or_create('customs', CustomsService)
@@ -4,10 +4,66 @@ Uses Groq LLM to intelligently classify product descriptions to HS codes.
 This approach requires no additional dependencies beyond Groq.
 """
 
+import asyncio
+import heapq
 import json
+import logging
 import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
-from groq import Groq
+import orjson
+from groq import AsyncGroq, Groq
+
+logger = logging.getLogger(__name__)
+
+# Products sent to the LLM in one request by classify_batch(); the HS
+# database in the prompt is shared by all of them
+CLASSIFY_BATCH_SIZE = 8
+# Upper bound on one LLM request made through the async API
+CLASSIFY_TIMEOUT_SECONDS = float(os.getenv("HS_CLASSIFY_TIMEOUT_SECONDS", 15))
+
+# The reply's JSON object is decoded in place from its opening brace, which
+# avoids backtracking over the whole reply with a greedy \{.*\} pattern
+_JSON_START_RE = re.compile(r'\{')
+_JSON_DECODER = json.JSONDecoder()
+
+# Classification results are reused for repeats of the same normalized
+# description; HS codes change at most quarterly, so a day is safe
+CLASSIFY_CACHE_SIZE = int(os.getenv("HS_CLASSIFY_CACHE_SIZE", 10000))
+CLASSIFY_CACHE_TTL_SECONDS = int(os.getenv("HS_CLASSIFY_CACHE_TTL_SECONDS", 86400))
+_WHITESPACE_RE = re.compile(r"\s+")
+_FALLBACK_REASONING = "Keyword-based match (fallback)"
+
+
+def _normalize_description(text: str) -> str:
+    """Lowercase and collapse whitespace for cache keys."""
+    return " ".join(_WHITESPACE_RE.split(text.strip().lower()))
+
+
+def _extract_json_object(text: str) -> Dict:
+    """Decode the first JSON object embedded in text (ValueError if none)."""
+    # Fast path: the prompt asks for nothing but the JSON object
+    if text.startswith("{"):
+        try:
+            obj = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if isinstance(obj, dict):
+                return obj
+
+    for match in _JSON_START_RE.finditer(text):
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, match.start())
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            return obj
+    raise ValueError("No JSON object found in LLM response")
 
 
 class LLMHSClassifier:
@@ -20,28 +76,64 @@ class LLMHSClassifier:
             hts_data_path: Path to HTS JSON database
         """
         self.hts_data_path = hts_data_path
-        self.hs_database = self._load_hts_database()
         self.groq_client = None
+        # (normalized description, top_n, temperature) -> (expires_at, results), LRU order
+        self._classify_cache: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._classify_cache_lock = threading.Lock()
+
+        # The database is held as parallel lists (entry i is _htsnos[i],
+        # _descriptions[i]) rather than one dict per raw JSON entry
+        data = self._load_hts_database()
+        self._htsnos = [item.get("htsno") for item in data]
+        self._descriptions = [item.get("description") or "" for item in data]
+        del data
+
+        # Everything below depends only on the HS database, so it is built once
+        # here rather than on every classification request
+        self._sampled_hs = self._create_knowledge_sample()
+        self._hs_list_str = "\n".join(
+            f"{self._htsnos[i]}: {self._descriptions[i]}" for i in self._sampled_hs
+        )
+        self._system_prompt = self._build_system_prompt()
+        # First entry wins for a repeated htsno, as with the old linear scan
+        self._htsno_index = dict(zip(reversed(self._htsnos), reversed(self._descriptions)))
+        # Inverted index for keyword fallback: word -> indexes of entries containing it
+        self._inverted = defaultdict(list)
+        for i, description in enumerate(self._descriptions):
+            for word in set(description.lower().split()):
+                self._inverted[word].append(i)
 
         # Initialize Groq client
-        api_key = os.getenv("GROQ_API_KEY")
-        if api_key:
-            self.groq_client = Groq(api_key=api_key)
-
-        print(f"✅ LLM HS Classifier initialized with {len(self.hs_database)} HS codes")
+        self._api_key = os.getenv("GROQ_API_KEY")
+        if self._api_key:
+            self.groq_client = Groq(api_key=self._api_key)
+        # Created on first async use, per event loop (see _get_async_client)
+        self._async_client = None
+        self._async_client_loop = None
+
+        logger.info("LLM HS Classifier initialized with %d HS codes", len(self._htsnos))
+
+    @property
+    def hs_database(self) -> List[Dict]:
+        """The database as a list of {'htsno', 'description'} dicts (built per access)."""
+        return [
+            {"htsno": htsno, "description": description}
+            for htsno, description in zip(self._htsnos, self._descriptions)
+        ]
 
     def _load_hts_database(self) -> List[Dict]:
         """Load the HTS database from JSON file."""
         try:
-            with open(self.hts_data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            print(f"📦 Loaded {len(data)} HTS entries from {self.hts_data_path}")
+            with open(self.hts_data_path, 'rb') as f:
+                raw = f.read()
+            data = orjson.loads(raw)
+            logger.info("Loaded %d HTS entries from %s", len(data), self.hts_data_path)
             return data
         except FileNotFoundError:
-            print(f"⚠️  HTS database not found at {self.hts_data_path}")
+            logger.warning("HTS database not found at %s", self.hts_data_path)
             return []
         except Exception as e:
-            print(f"❌ Error loading HTS database: {e}")
+            logger.error("Error loading HTS database: %s", e)
             return []
 
     def classify(
@@ -60,74 +152,230 @@ class LLMHSClassifier:
         Returns:
             List of dicts with keys: hs_code, description, confidence, reasoning
         """
-        if not self.hs_database:
-            print("❌ No HTS database loaded")
+        if not self._htsnos:
+            logger.error("No HTS database loaded")
             return []
 
         if not self.groq_client:
-            print("❌ Groq client not initialized")
+            logger.error("Groq client not initialized")
             return []
 
         if not product_description or not product_description.strip():
             return []
 
-        print(f"\n{'='*80}")
-        print(f"🔍 HS CODE CLASSIFICATION")
-        print(f"{'='*80}")
-        print(f"📝 Product: {product_description}")
-        print(f"🎯 Requesting top {top_n} matches...")
+        logger.debug("HS code classification of %r (top %d)", product_description, top_n)
+
+        results = self.classify_batch([product_description], top_n, temperature)[0]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found %d HS code matches", len(results))
+            for i, result in enumerate(results, 1):
+                logger.debug("%d. %s: %s... (%.1f%%)", i, result['hs_code'],
+                             result['description'][:60], result['confidence'] * 100)
+
+        return results
+
+    def classify_batch(
+        self,
+        product_descriptions: List[str],
+        top_n: int = 5,
+        temperature: float = 0.1,
+        max_workers: int = 8
+    ) -> List[List[Dict[str, any]]]:
+        """Classify several product descriptions, up to CLASSIFY_BATCH_SIZE per LLM call.
+
+        The HS database is sent once per request rather than once per product;
+        when there are more products than fit in one request, the requests
+        run concurrently.
+
+        Args:
+            product_descriptions: Descriptions of the products to classify
+            top_n: Number of top matches to return per product
+            temperature: LLM temperature (lower = more deterministic)
+            max_workers: Maximum number of requests in flight
+
+        Returns:
+            One result list (as returned by classify()) per description, in input order
+        """
+        results, pending, chunks = self._plan_batch(product_descriptions, top_n, temperature)
+
+        def run(chunk):
+            return self._classify_chunk([product_descriptions[pending[key][0]] for key in chunk], top_n, temperature)
+
+        if len(chunks) <= 1:
+            chunk_results = [run(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+                chunk_results = list(pool.map(run, chunks))
+
+        return self._finish_batch(results, pending, chunks, chunk_results)
+
+    async def classify_async(
+        self,
+        product_description: str,
+        top_n: int = 5,
+        temperature: float = 0.1
+    ) -> List[Dict[str, any]]:
+        """classify() for asyncio callers; the LLM call does not block the event loop."""
+        return (await self.classify_batch_async([product_description], top_n, temperature))[0]
 
-        # Create a knowledge base of HS codes for the LLM
-        # Sample a diverse subset to stay within token limits
-        sampled_hs = self._create_knowledge_sample()
+    async def classify_batch_async(
+        self,
+        product_descriptions: List[str],
+        top_n: int = 5,
+        temperature: float = 0.1
+    ) -> List[List[Dict[str, any]]]:
+        """classify_batch() for asyncio callers, with the requests awaited together.
 
-        # Build the LLM prompt
-        system_prompt = self._build_system_prompt()
-        user_prompt = self._build_user_prompt(product_description, sampled_hs, top_n)
+        Each request is bounded by CLASSIFY_TIMEOUT_SECONDS; a timed-out or
+        failed request yields empty results for its products.
+        """
+        results, pending, chunks = self._plan_batch(product_descriptions, top_n, temperature)
+        chunk_results = await asyncio.gather(*(
+            self._classify_chunk_async([product_descriptions[pending[key][0]] for key in chunk], top_n, temperature)
+            for chunk in chunks
+        ))
+        return self._finish_batch(results, pending, chunks, chunk_results)
+
+    def _plan_batch(self, product_descriptions: List[str], top_n: int, temperature: float):
+        """Fill cached results and group the remaining distinct keys into LLM requests.
+
+        Returns (results, pending, chunks): pending maps each uncached key to the
+        input positions sharing it, chunks lists the keys for each request.
+        """
+        results = [[] for _ in product_descriptions]
+        if not self._htsnos or not self.groq_client:
+            return results, {}, []
+
+        # Serve repeats from the cache; each distinct uncached key is sent once
+        pending = {}
+        for i, desc in enumerate(product_descriptions):
+            if not desc or not desc.strip():
+                continue
+            key = (_normalize_description(desc), top_n, temperature)
+            cached = self._classify_cache_get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = list(pending)
+        chunks = [keys[i:i + CLASSIFY_BATCH_SIZE] for i in range(0, len(keys), CLASSIFY_BATCH_SIZE)]
+        return results, pending, chunks
+
+    def _finish_batch(self, results, pending, chunks, chunk_results) -> List[List[Dict[str, any]]]:
+        """Cache the fresh results and copy them to every input position."""
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for key, result in zip(chunk, chunk_result):
+                # Keyword fallbacks stand in for a failed reply; retry those next time
+                if result and result[0]["reasoning"] != _FALLBACK_REASONING:
+                    self._classify_cache_put(key, result)
+                for i in pending[key]:
+                    results[i] = [dict(match) for match in result]
+        return results
 
+    def _classify_cache_get(self, key: Tuple) -> List[Dict]:
+        with self._classify_cache_lock:
+            entry = self._classify_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._classify_cache[key]
+                return None
+            self._classify_cache.move_to_end(key)
+            return [dict(match) for match in entry[1]]
+
+    def _classify_cache_put(self, key: Tuple, result: List[Dict]) -> None:
+        with self._classify_cache_lock:
+            self._classify_cache[key] = (
+                time.monotonic() + CLASSIFY_CACHE_TTL_SECONDS,
+                [dict(match) for match in result]
+            )
+            self._classify_cache.move_to_end(key)
+            while len(self._classify_cache) > CLASSIFY_CACHE_SIZE:
+                self._classify_cache.popitem(last=False)
+
+    def _completion_request(self, product_descriptions: List[str], top_n: int, temperature: float) -> Dict:
+        """Chat completion arguments classifying the given products in one request."""
+        # Build the LLM prompt around the precomputed HS knowledge base
+        user_prompt = self._build_user_prompt(product_descriptions, top_n)
+        return {
+            "model": os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
+            "messages": [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": 1000 * len(product_descriptions)
+        }
+
+    def _classify_chunk(
+        self,
+        product_descriptions: List[str],
+        top_n: int,
+        temperature: float
+    ) -> List[List[Dict[str, any]]]:
+        """Classify up to CLASSIFY_BATCH_SIZE products with a single LLM request."""
         try:
             # Call Groq LLM
             response = self.groq_client.chat.completions.create(
-                model=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=1000
+                **self._completion_request(product_descriptions, top_n, temperature)
             )
+            return self._parse_completion(response, product_descriptions, top_n)
 
-            raw_response = response.choices[0].message.content.strip()
-            print(f"\n💬 LLM Response:\n{'-'*80}\n{raw_response}\n{'-'*80}")
+        except Exception as e:
+            logger.error("Error during LLM classification: %s", e)
+            return [[] for _ in product_descriptions]
 
-            # Parse the LLM response
-            results = self._parse_llm_response(raw_response, top_n)
+    async def _classify_chunk_async(
+        self,
+        product_descriptions: List[str],
+        top_n: int,
+        temperature: float
+    ) -> List[List[Dict[str, any]]]:
+        """Awaitable _classify_chunk, bounded by CLASSIFY_TIMEOUT_SECONDS."""
+        try:
+            response = await asyncio.wait_for(
+                self._get_async_client().chat.completions.create(
+                    **self._completion_request(product_descriptions, top_n, temperature)
+                ),
+                CLASSIFY_TIMEOUT_SECONDS
+            )
+            return self._parse_completion(response, product_descriptions, top_n)
 
-            print(f"\n✅ Found {len(results)} HS code matches")
-            for i, result in enumerate(results, 1):
-                print(f"{i}. {result['hs_code']}: {result['description'][:60]}... ({result['confidence']:.1%})")
+        except Exception as e:
+            logger.error("Error during LLM classification: %s", str(e) or type(e).__name__)
+            return [[] for _ in product_descriptions]
 
-            print(f"{'='*80}\n")
+    def _get_async_client(self) -> AsyncGroq:
+        """AsyncGroq client for the running event loop (its connections are loop-bound)."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncGroq(api_key=self._api_key)
+            self._async_client_loop = loop
+        return self._async_client
 
-            return results
+    def _parse_completion(self, response, product_descriptions: List[str], top_n: int) -> List[List[Dict]]:
+        raw_response = response.choices[0].message.content.strip()
+        logger.debug("Raw LLM response:\n%s", raw_response)
 
-        except Exception as e:
-            print(f"❌ Error during LLM classification: {e}")
-            return []
+        # Parse the LLM response
+        return self._parse_llm_response(raw_response, product_descriptions, top_n)
 
-    def _create_knowledge_sample(self) -> List[Dict]:
+    def _create_knowledge_sample(self) -> range:
         """Create a diverse sample of the HS database for the LLM.
 
         Samples entries to provide good coverage while staying within token limits.
+        Returns the indexes of the sampled entries.
         """
         # For now, include all entries if under 120 items
         # In production, you might want to implement smart sampling
-        if len(self.hs_database) <= 120:
-            return self.hs_database
+        if len(self._htsnos) <= 120:
+            return range(len(self._htsnos))
 
         # Sample evenly across the database
-        step = len(self.hs_database) // 120
-        return [self.hs_database[i] for i in range(0, len(self.hs_database), step)]
+        step = len(self._htsnos) // 120
+        return range(0, len(self._htsnos), step)
 
     def _build_system_prompt(self) -> str:
         """Build the system prompt for the LLM."""
@@ -143,29 +391,30 @@ Your task is to:
 3. Provide confidence scores and reasoning for each match
 4. Return results in the exact JSON format specified"""
 
-    def _build_user_prompt(self, product_desc: str, hs_sample: List[Dict], top_n: int) -> str:
-        """Build the user prompt with product and HS database."""
-        # Format the HS database for the prompt
-        hs_list = "\n".join([
-            f"{item['htsno']}: {item['description']}"
-            for item in hs_sample
-        ])
+    def _build_user_prompt(self, product_descs: List[str], top_n: int) -> str:
+        """Build the user prompt with the numbered products and the HS database."""
+        products = "\n".join(f'{i}. "{desc}"' for i, desc in enumerate(product_descs, 1))
 
-        prompt = f"""Product Description to Classify:
-"{product_desc}"
+        prompt = f"""Product Descriptions to Classify:
+{products}
 
 Available HS Codes Database:
-{hs_list}
+{self._hs_list_str}
 
-Task: Classify the product to the top {top_n} most appropriate HS codes.
+Task: Classify each product to the top {top_n} most appropriate HS codes.
 
-Return your response in this EXACT JSON format:
+Return your response in this EXACT JSON format, with one entry per product:
 {{
-  "matches": [
+  "results": [
     {{
-      "hs_code": "8518300000",
-      "confidence": 0.95,
-      "reasoning": "Brief explanation of why this code matches"
+      "product_index": 1,
+      "matches": [
+        {{
+          "hs_code": "8518300000",
+          "confidence": 0.95,
+          "reasoning": "Brief explanation of why this code matches"
+        }}
+      ]
     }}
   ]
 }}
@@ -179,72 +428,72 @@ Return ONLY the JSON, no additional text."""
 
         return prompt
 
-    def _parse_llm_response(self, response_text: str, top_n: int) -> List[Dict]:
-        """Parse the LLM's JSON response into structured results."""
+    def _parse_llm_response(self, response_text: str, product_descs: List[str], top_n: int) -> List[List[Dict]]:
+        """Parse the LLM's JSON response into structured results, one list per product."""
         try:
             # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                response_json = json.loads(json_match.group(0))
-            else:
-                response_json = json.loads(response_text)
+            response_json = _extract_json_object(response_text)
+
+            matches_by_index = {
+                result.get("product_index"): result.get("matches", [])
+                for result in response_json.get("results", [])
+            }
+            # Tolerate the single-product shape {"matches": [...]}
+            if not matches_by_index and len(product_descs) == 1:
+                matches_by_index[1] = response_json.get("matches", [])
+
+            return [
+                self._enrich_matches(matches_by_index[i], top_n) if i in matches_by_index
+                else self._fallback_keyword_match(product_desc, top_n)
+                for i, product_desc in enumerate(product_descs, 1)
+            ]
 
-            matches = response_json.get("matches", [])
-
-            # Enrich with full descriptions from database
-            results = []
-            for match in matches[:top_n]:
-                hs_code = match.get("hs_code", "")
-                confidence = match.get("confidence", 0.5)
-                reasoning = match.get("reasoning", "")
+        except Exception as e:
+            logger.warning("Error parsing LLM response: %s", e)
+            # Fallback: try simple keyword matching
+            return [self._fallback_keyword_match(product_desc, top_n) for product_desc in product_descs]
 
-                # Find full description from database
-                full_desc = ""
-                for item in self.hs_database:
-                    if item["htsno"] == hs_code:
-                        full_desc = item["description"]
-                        break
+    def _enrich_matches(self, matches: List[Dict], top_n: int) -> List[Dict]:
+        """Add full database descriptions to one product's LLM matches."""
+        results = []
+        for match in matches[:top_n]:
+            hs_code = match.get("hs_code", "")
+            confidence = match.get("confidence", 0.5)
+            reasoning = match.get("reasoning", "")
 
-                results.append({
-                    "hs_code": hs_code,
-                    "description": full_desc or "Description not found",
-                    "confidence": float(confidence),
-                    "reasoning": reasoning
-                })
+            # Find full description from database
+            full_desc = self._htsno_index.get(hs_code, "")
 
-            return results
+            results.append({
+                "hs_code": hs_code,
+                "description": full_desc or "Description not found",
+                "confidence": float(confidence),
+                "reasoning": reasoning
+            })
 
-        except Exception as e:
-            print(f"⚠️  Error parsing LLM response: {e}")
-            # Fallback: try simple keyword matching
-            return self._fallback_keyword_match(response_text, top_n)
+        return results
 
     def _fallback_keyword_match(self, product_desc: str, top_n: int) -> List[Dict]:
         """Fallback: Simple keyword-based matching if LLM response fails."""
-        print("⚠️  Using fallback keyword matching")
-
-        product_words = set(product_desc.lower().split())
-        scored_entries = []
+        logger.warning("Using fallback keyword matching")
 
-        for entry in self.hs_database:
-            desc_words = set(entry["description"].lower().split())
-            # Simple word overlap score
-            overlap = len(product_words & desc_words)
-            if overlap > 0:
-                scored_entries.append((entry, overlap))
+        # Simple word overlap score, counted only over entries sharing a word
+        overlap = Counter()
+        for word in set(product_desc.lower().split()):
+            overlap.update(self._inverted.get(word, ()))
+        if not overlap or top_n <= 0:
+            return []
 
-        # Sort by score
-        scored_entries.sort(key=lambda x: x[1], reverse=True)
+        # Top N by score; ties keep database order
+        top = heapq.nsmallest(top_n, overlap.items(), key=lambda item: (-item[1], item[0]))
 
-        # Return top N
         results = []
-        for entry, score in scored_entries[:top_n]:
+        for i, score in top:
             results.append({
-                "hs_code": entry["htsno"],
-                "description": entry["description"],
+                "hs_code": self._htsnos[i],
+                "description": self._descriptions[i],
                 "confidence": min(0.5, score * 0.1),  # Cap at 50% for keyword matching
-                "reasoning": "Keyword-based match (fallback)"
+                "reasoning": _FALLBACK_REASONING
             })
 
         return results
@@ -268,6 +517,7 @@ def get_classifier() -> LLMHSClassifier:
 
 if __name__ == "__main__":
     # Test the classifier
+    logging.basicConfig(level=logging.INFO)
     classifier = LLMHSClassifier()
 
     test_products = [
@@ -278,10 +528,12 @@ if __name__ == "__main__":
         "LED television 55 inch"
     ]
 
-    for product in test_products:
+    # The test products are classified through the async API in one request
+    batch_results = asyncio.run(classifier.classify_batch_async(test_products, top_n=3))
+
+    for product, results in zip(test_products, batch_results):
         print(f"\n\nTesting: {product}")
         print("=" * 80)
-        results = classifier.classify(product, top_n=3)
 
         if results:
             for i, result in enumerate(results, 1):
@@ -7,11 +7,111 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import enum
-from sqlalchemy.dialects.postgresql import JSON
+import math
+from collections import namedtuple
+from sqlalchemy.dialects.postgresql import JSON, JSONB
+from sqlalchemy import DDL, Computed, event, func, select
+from sqlalchemy.orm import column_property, joinedload
 from sqlalchemy import Enum as SQLEnum
 
 db = SQLAlchemy()
 
+# Substring searches (ILIKE '%term%') can't use a btree index; on PostgreSQL
+# they are served by pg_trgm GIN indexes instead. Other databases skip both.
+event.listen(
+    db.metadata, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
+
+def _trgm_index(name, column):
+    """GIN trigram index on `column`, created on PostgreSQL only"""
+    return db.Index(
+        name, column,
+        postgresql_using='gin',
+        postgresql_ops={column: 'gin_trgm_ops'}
+    ).ddl_if(dialect='postgresql')
+
+
+# JSON documents are stored as JSONB on PostgreSQL: parsed once on write and
+# indexable with GIN for @> containment. Other databases keep plain JSON.
+_JSONB = JSON().with_variant(JSONB(), 'postgresql')
+
+
+def _jsonb_index(name, column):
+    """GIN jsonb_path_ops index on `column` (serves @>), created on PostgreSQL only"""
+    return db.Index(
+        name, column,
+        postgresql_using='gin',
+        postgresql_ops={column: 'jsonb_path_ops'}
+    ).ddl_if(dialect='postgresql')
+
+
+# Money is stored as exact decimals and read back as Decimal; to_dict()
+# converts to float only for the JSON output (_money)
+_MONEY = db.Numeric(18, 4)
+
+# ============================================================================
+# SERIALIZATION
+# ============================================================================
+
+_FieldSet = namedtuple('_FieldSet', 'plain converted nested attrs')
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _money(value):
+    return float(value) if value is not None else None
+
+
+def _fields(*specs):
+    """Declare a to_dict() layout once, at class definition.
+
+    Each spec is 'attr', ('key', 'attr') to rename, ('key', converter) to
+    pass the value through e.g. _iso/_enum_value, or ('key', _fields(...))
+    for a nested dict such as an address.
+    """
+    plain, converted, nested, attrs = [], [], [], set()
+    for spec in specs:
+        key, target = (spec, spec) if isinstance(spec, str) else spec
+        if isinstance(target, _FieldSet):
+            nested.append((key, target))
+            attrs |= target.attrs
+        elif callable(target):
+            converted.append((key, target))
+            attrs.add(key)
+        else:
+            plain.append((key, target))
+            attrs.add(target)
+    return _FieldSet(tuple(plain), tuple(converted), tuple(nested), frozenset(attrs))
+
+
+def _serialize(obj, fieldset, values=None):
+    """Build the to_dict() output for `fieldset` from a model instance or column row.
+
+    Instances are read through their __dict__ rather than the attribute
+    descriptors; only attributes not loaded yet (expired, deferred or never
+    set) go through getattr. Rows from _column_rows() are read by column name.
+    """
+    if values is None:
+        values = getattr(obj, '_mapping', None)
+        if values is None:
+            values = obj.__dict__
+            missing = fieldset.attrs - values.keys()
+            if missing:
+                values = dict(values)
+                for attr in missing:
+                    values[attr] = getattr(obj, attr)
+
+    data = {key: values[attr] for key, attr in fieldset.plain}
+    for key, convert in fieldset.converted:
+        data[key] = convert(values[key])
+    for key, nested in fieldset.nested:
+        data[key] = _serialize(obj, nested, values)
+    return data
+
 # ============================================================================
 # ENUMS FOR TYPE SAFETY
 # ============================================================================
@@ -100,6 +200,16 @@ class ActivityType(enum.Enum):
     TASK = "task"
     DOCUMENT = "document"
 
+# Member -> .value for every enum above, built once; to_dict() converts enum
+# columns with a dict lookup instead of the .value property (None maps to None)
+_ENUM_VALUES = {
+    member: member.value
+    for enum_cls in (UserRole, CompanyType, LeadStatus, OrderStatus, PaymentStatus,
+                     PaymentMethod, ShipmentStatus, DocumentType, ActivityType)
+    for member in enum_cls
+}
+_enum_value = _ENUM_VALUES.get
+
 # ============================================================================
 # USER MANAGEMENT
 # ============================================================================
@@ -132,21 +242,15 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    _dict_fields = _fields(
+        'id', 'email', 'username', 'first_name', 'last_name', ('role', _enum_value),
+        'phone', 'avatar_url', 'is_active', ('last_login', _iso), ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'username': self.username,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'full_name': f"{self.first_name} {self.last_name}",
-            'role': self.role.value,
-            'phone': self.phone,
-            'avatar_url': self.avatar_url,
-            'is_active': self.is_active,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
-            'created_at': self.created_at.isoformat()
-        }
+        data = _serialize(self, User._dict_fields)
+        data['full_name'] = f"{data['first_name']} {data['last_name']}"
+        return data
 
 # ============================================================================
 # CRM - COMPANIES & CONTACTS
@@ -174,61 +278,56 @@ class Company(db.Model):
 
     # Business details
     industry = db.Column(db.String(100))
-    annual_revenue = db.Column(db.Float)
+    annual_revenue = db.Column(_MONEY)
     employee_count = db.Column(db.Integer)
     payment_terms = db.Column(db.String(100))  # e.g., "Net 30", "Net 60"
-    credit_limit = db.Column(db.Float)
+    credit_limit = db.Column(_MONEY)
 
     # Metadata
     notes = db.Column(db.Text)
-    tags = db.Column(JSON)
-    custom_fields = db.Column(JSON)
+    tags = db.Column(_JSONB)
+    custom_fields = db.Column(_JSONB)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    contacts = db.relationship('Contact', backref='company', lazy='dynamic', cascade='all, delete-orphan')
+    contacts = db.relationship('Contact', backref='company', cascade='all, delete-orphan', order_by='Contact.id')
     leads = db.relationship('Lead', backref='company', lazy='dynamic')
     orders = db.relationship('Order', backref='company', lazy='dynamic')
     invoices = db.relationship('Invoice', backref='company', lazy='dynamic')
     shipments = db.relationship('Shipment', backref='company', lazy='dynamic')
     activities = db.relationship('Activity', backref='company', lazy='dynamic')
 
+    __table_args__ = (
+        # Supports keyset pagination on (name, id) in the companies list
+        db.Index('ix_companies_name_id', 'name', 'id'),
+        # Name/email search in the companies list
+        _trgm_index('ix_companies_name_trgm', 'name'),
+        _trgm_index('ix_companies_email_trgm', 'email'),
+        # Tag containment, e.g. Company.tags.contains(['vip']) on PostgreSQL
+        _jsonb_index('ix_companies_tags_gin', 'tags'),
+    )
+
+    _dict_fields = _fields(
+        'id', 'name', 'legal_name', ('company_type', _enum_value), 'tax_id', 'website', 'email', 'phone',
+        ('address', _fields(
+            ('line1', 'address_line1'), ('line2', 'address_line2'),
+            'city', 'state', 'postal_code', 'country'
+        )),
+        'industry', ('annual_revenue', _money), 'employee_count', 'payment_terms', ('credit_limit', _money),
+        'notes', 'tags', 'is_active', ('created_at', _iso), ('updated_at', _iso)
+    )
+
     def to_dict(self, include_relationships=False):
-        data = {
-            'id': self.id,
-            'name': self.name,
-            'legal_name': self.legal_name,
-            'company_type': self.company_type.value,
-            'tax_id': self.tax_id,
-            'website': self.website,
-            'email': self.email,
-            'phone': self.phone,
-            'address': {
-                'line1': self.address_line1,
-                'line2': self.address_line2,
-                'city': self.city,
-                'state': self.state,
-                'postal_code': self.postal_code,
-                'country': self.country
-            },
-            'industry': self.industry,
-            'annual_revenue': self.annual_revenue,
-            'employee_count': self.employee_count,
-            'payment_terms': self.payment_terms,
-            'credit_limit': self.credit_limit,
-            'notes': self.notes,
-            'tags': self.tags,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        data = _serialize(self, Company._dict_fields)
 
         if include_relationships:
-            data['contacts'] = [c.to_dict() for c in self.contacts.all()]
-            data['orders_count'] = self.orders.count()
-            data['invoices_count'] = self.invoices.count()
+            # Load with selectinload(Company.contacts) and
+            # undefer_group('relationship_counts') to avoid the per-company queries
+            data['contacts'] = [c.to_dict() for c in self.contacts]
+            data['orders_count'] = self.orders_count
+            data['invoices_count'] = self.invoices_count
 
         return data
 
@@ -252,22 +351,22 @@ class Contact(db.Model):
     # Relationships
     activities = db.relationship('Activity', backref='contact', lazy='dynamic')
 
+    __table_args__ = (
+        # Name/email search in the contacts list
+        _trgm_index('ix_contacts_first_name_trgm', 'first_name'),
+        _trgm_index('ix_contacts_last_name_trgm', 'last_name'),
+        _trgm_index('ix_contacts_email_trgm', 'email'),
+    )
+
+    _dict_fields = _fields(
+        'id', 'company_id', 'first_name', 'last_name', 'title', 'department',
+        'email', 'phone', 'mobile', 'is_primary', 'notes', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'company_id': self.company_id,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'full_name': f"{self.first_name} {self.last_name}",
-            'title': self.title,
-            'department': self.department,
-            'email': self.email,
-            'phone': self.phone,
-            'mobile': self.mobile,
-            'is_primary': self.is_primary,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat()
-        }
+        data = _serialize(self, Contact._dict_fields)
+        data['full_name'] = f"{data['first_name']} {data['last_name']}"
+        return data
 
 # ============================================================================
 # CRM - LEADS & OPPORTUNITIES
@@ -282,7 +381,7 @@ class Lead(db.Model):
     description = db.Column(db.Text)
     status = db.Column(SQLEnum(LeadStatus), default=LeadStatus.NEW, index=True)
     source = db.Column(db.String(100))  # e.g., "Website", "Referral", "Trade Show"
-    estimated_value = db.Column(db.Float)
+    estimated_value = db.Column(_MONEY)
     probability = db.Column(db.Integer)  # 0-100
     expected_close_date = db.Column(db.Date)
     assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -296,25 +395,22 @@ class Lead(db.Model):
     # Relationships
     assigned_user = db.relationship('User', backref='assigned_leads', foreign_keys=[assigned_to])
 
+    __table_args__ = (
+        # Keyset pagination of the leads list, unfiltered and by status/assignee
+        db.Index('ix_leads_created_id', 'created_at', 'id'),
+        db.Index('ix_leads_status_created', 'status', 'created_at'),
+        db.Index('ix_leads_assigned_created', 'assigned_to', 'created_at'),
+    )
+
+    _dict_fields = _fields(
+        'id', 'company_id', 'title', 'description', ('status', _enum_value), 'source',
+        ('estimated_value', _money), 'probability', ('expected_close_date', _iso), 'assigned_to',
+        'contact_name', 'contact_email', 'contact_phone', 'notes',
+        ('created_at', _iso), ('updated_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'company_id': self.company_id,
-            'title': self.title,
-            'description': self.description,
-            'status': self.status.value,
-            'source': self.source,
-            'estimated_value': self.estimated_value,
-            'probability': self.probability,
-            'expected_close_date': self.expected_close_date.isoformat() if self.expected_close_date else None,
-            'assigned_to': self.assigned_to,
-            'contact_name': self.contact_name,
-            'contact_email': self.contact_email,
-            'contact_phone': self.contact_phone,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        return _serialize(self, Lead._dict_fields)
 
 # ============================================================================
 # PRODUCT MANAGEMENT
@@ -329,7 +425,7 @@ class Product(db.Model):
     description = db.Column(db.Text)
     hs_code = db.Column(db.String(20), index=True)
     category = db.Column(db.String(100))
-    unit_price = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(_MONEY, nullable=False)
     currency = db.Column(db.String(3), default='USD')
     unit_of_measure = db.Column(db.String(50))  # kg, pcs, boxes, etc.
 
@@ -352,46 +448,34 @@ class Product(db.Model):
 
     # Metadata
     image_url = db.Column(db.String(500))
-    tags = db.Column(JSON)
-    custom_fields = db.Column(JSON)
+    tags = db.Column(_JSONB)
+    custom_fields = db.Column(_JSONB)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    inventory_items = db.relationship('InventoryItem', backref='product', lazy='dynamic')
+    inventory_items = db.relationship('InventoryItem', backref='product')
     order_items = db.relationship('OrderItem', backref='product', lazy='dynamic')
 
+    __table_args__ = (
+        # Supports keyset pagination on (name, id) in the products list
+        db.Index('ix_products_name_id', 'name', 'id'),
+        _jsonb_index('ix_products_tags_gin', 'tags'),
+    )
+
+    _dict_fields = _fields(
+        'id', 'sku', 'name', 'description', 'hs_code', 'category',
+        ('unit_price', _money), 'currency', 'unit_of_measure',
+        ('dimensions', _fields('weight', 'weight_unit', 'length', 'width', 'height', 'dimension_unit')),
+        'origin_country', 'manufacturer', 'brand', 'image_url', 'is_active', ('created_at', _iso)
+    )
+
     def to_dict(self, include_inventory=False):
-        data = {
-            'id': self.id,
-            'sku': self.sku,
-            'name': self.name,
-            'description': self.description,
-            'hs_code': self.hs_code,
-            'category': self.category,
-            'unit_price': self.unit_price,
-            'currency': self.currency,
-            'unit_of_measure': self.unit_of_measure,
-            'dimensions': {
-                'weight': self.weight,
-                'weight_unit': self.weight_unit,
-                'length': self.length,
-                'width': self.width,
-                'height': self.height,
-                'dimension_unit': self.dimension_unit
-            },
-            'origin_country': self.origin_country,
-            'manufacturer': self.manufacturer,
-            'brand': self.brand,
-            'image_url': self.image_url,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat()
-        }
+        data = _serialize(self, Product._dict_fields)
 
         if include_inventory:
-            total_stock = sum(item.quantity_available for item in self.inventory_items.all())
-            data['total_stock'] = total_stock
+            data['total_stock'] = self.total_stock
 
         return data
 
@@ -419,23 +503,17 @@ class Warehouse(db.Model):
     # Relationships
     inventory_items = db.relationship('InventoryItem', backref='warehouse', lazy='dynamic')
 
+    _dict_fields = _fields(
+        'id', 'name', 'code',
+        ('address', _fields(
+            ('line1', 'address_line1'), ('line2', 'address_line2'),
+            'city', 'state', 'postal_code', 'country'
+        )),
+        'manager_name', 'phone', 'is_active'
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'code': self.code,
-            'address': {
-                'line1': self.address_line1,
-                'line2': self.address_line2,
-                'city': self.city,
-                'state': self.state,
-                'postal_code': self.postal_code,
-                'country': self.country
-            },
-            'manager_name': self.manager_name,
-            'phone': self.phone,
-            'is_active': self.is_active
-        }
+        return _serialize(self, Warehouse._dict_fields)
 
 class InventoryItem(db.Model):
     __tablename__ = 'inventory_items'
@@ -454,18 +532,23 @@ class InventoryItem(db.Model):
         db.UniqueConstraint('product_id', 'warehouse_id', name='uix_product_warehouse'),
     )
 
+    _dict_fields = _fields(
+        'id', 'product_id', 'warehouse_id', 'quantity_available', 'quantity_reserved',
+        'quantity_on_order', 'location', ('last_counted_at', _iso), ('updated_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'product_id': self.product_id,
-            'warehouse_id': self.warehouse_id,
-            'quantity_available': self.quantity_available,
-            'quantity_reserved': self.quantity_reserved,
-            'quantity_on_order': self.quantity_on_order,
-            'location': self.location,
-            'last_counted_at': self.last_counted_at.isoformat() if self.last_counted_at else None,
-            'updated_at': self.updated_at.isoformat()
-        }
+        return _serialize(self, InventoryItem._dict_fields)
+
+# Stock on hand across warehouses, summed in the database. Deferred: loaded
+# on first access, e.g. by Product.to_dict(include_inventory=True)
+Product.total_stock = column_property(
+    select(func.coalesce(func.sum(InventoryItem.quantity_available), 0))
+    .where(InventoryItem.product_id == Product.id)
+    .correlate_except(InventoryItem)
+    .scalar_subquery(),
+    deferred=True
+)
 
 # ============================================================================
 # ORDER MANAGEMENT
@@ -482,11 +565,11 @@ class Order(db.Model):
     order_date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
 
     # Financial
-    subtotal = db.Column(db.Float, default=0)
-    tax_amount = db.Column(db.Float, default=0)
-    shipping_cost = db.Column(db.Float, default=0)
-    discount_amount = db.Column(db.Float, default=0)
-    total_amount = db.Column(db.Float, default=0)
+    subtotal = db.Column(_MONEY, default=0)
+    tax_amount = db.Column(_MONEY, default=0)
+    shipping_cost = db.Column(_MONEY, default=0)
+    discount_amount = db.Column(_MONEY, default=0)
+    total_amount = db.Column(_MONEY, default=0)
     currency = db.Column(db.String(3), default='USD')
 
     # Payment
@@ -513,44 +596,57 @@ class Order(db.Model):
     # Relationships
     contact = db.relationship('Contact', backref='orders')
     sales_user = db.relationship('User', backref='orders_created', foreign_keys=[sales_person])
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan', order_by='OrderItem.id')
     invoices = db.relationship('Invoice', backref='order', lazy='dynamic')
     shipments = db.relationship('Shipment', backref='order', lazy='dynamic')
 
+    __table_args__ = (
+        # Orders list (newest first), unfiltered and by status/company, and
+        # the dashboard's recent orders
+        db.Index('ix_orders_created_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+        db.Index('ix_orders_company_created', 'company_id', 'created_at'),
+        # Dashboard revenue: paid orders by order_date. Covering on
+        # PostgreSQL, so the sums never visit the table
+        db.Index(
+            'ix_orders_paid_date', 'payment_status', 'order_date',
+            postgresql_include=['total_amount']
+        ),
+    )
+
+    def set_totals(self, line_totals, tax_rate, shipping_cost=0, discount_amount=0):
+        """Set subtotal, tax, shipping, discount and total from the item line totals"""
+        # fsum: one pass over any iterable, correctly rounded (no float drift)
+        self.subtotal = math.fsum(line_totals)
+        self.tax_amount = self.subtotal * tax_rate
+        self.shipping_cost = shipping_cost
+        self.discount_amount = discount_amount
+        self.total_amount = self.subtotal + self.tax_amount + self.shipping_cost - self.discount_amount
+
+    _dict_fields = _fields(
+        'id', 'order_number', 'company_id', 'contact_id', ('status', _enum_value), ('order_date', _iso),
+        ('subtotal', _money), ('tax_amount', _money), ('shipping_cost', _money),
+        ('discount_amount', _money), ('total_amount', _money), 'currency',
+        ('payment_status', _enum_value), ('payment_method', _enum_value), 'payment_terms', 'incoterm',
+        ('shipping_address', _fields(
+            ('line1', 'shipping_address_line1'), ('line2', 'shipping_address_line2'),
+            ('city', 'shipping_city'), ('state', 'shipping_state'),
+            ('postal_code', 'shipping_postal_code'), ('country', 'shipping_country')
+        )),
+        'notes', 'sales_person', ('created_at', _iso), ('updated_at', _iso)
+    )
+
     def to_dict(self, include_items=False):
-        data = {
-            'id': self.id,
-            'order_number': self.order_number,
-            'company_id': self.company_id,
-            'contact_id': self.contact_id,
-            'status': self.status.value,
-            'order_date': self.order_date.isoformat(),
-            'subtotal': self.subtotal,
-            'tax_amount': self.tax_amount,
-            'shipping_cost': self.shipping_cost,
-            'discount_amount': self.discount_amount,
-            'total_amount': self.total_amount,
-            'currency': self.currency,
-            'payment_status': self.payment_status.value,
-            'payment_method': self.payment_method.value if self.payment_method else None,
-            'payment_terms': self.payment_terms,
-            'incoterm': self.incoterm,
-            'shipping_address': {
-                'line1': self.shipping_address_line1,
-                'line2': self.shipping_address_line2,
-                'city': self.shipping_city,
-                'state': self.shipping_state,
-                'postal_code': self.shipping_postal_code,
-                'country': self.shipping_country
-            },
-            'notes': self.notes,
-            'sales_person': self.sales_person,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        data = _serialize(self, Order._dict_fields)
 
         if include_items:
-            data['items'] = [item.to_dict() for item in self.items.all()]
+            items = self.__dict__.get('items')
+            if items is None:
+                # Not eager-loaded: fetch the lines with their products in one
+                # query (OrderItem.to_dict reads the product)
+                items = (OrderItem.query.options(joinedload(OrderItem.product))
+                         .filter_by(order_id=self.id).order_by(OrderItem.id).all())
+            data['items'] = [item.to_dict() for item in items]
 
         return data
 
@@ -561,25 +657,41 @@ class OrderItem(db.Model):
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
-    unit_price = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(_MONEY, nullable=False)
     discount_percent = db.Column(db.Float, default=0)
     tax_percent = db.Column(db.Float, default=0)
-    line_total = db.Column(db.Float, nullable=False)
+    # Stored generated column; line_total() below is the same formula in Python
+    line_total = db.Column(
+        _MONEY,
+        Computed('quantity * unit_price * (1 - COALESCE(discount_percent, 0) / 100.0)', persisted=True)
+    )
     notes = db.Column(db.Text)
 
+    @staticmethod
+    def compute_line_total(quantity, unit_price, discount_percent=0):
+        """Python mirror of the line_total column, for totals computed before insert"""
+        return quantity * unit_price * (1 - (discount_percent or 0) / 100.0)
+
+    _dict_fields = _fields(
+        'id', 'order_id', 'product_id', 'quantity', ('unit_price', _money),
+        'discount_percent', 'tax_percent', ('line_total', _money), 'notes'
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'product_id': self.product_id,
-            'product_name': self.product.name if self.product else None,
-            'quantity': self.quantity,
-            'unit_price': self.unit_price,
-            'discount_percent': self.discount_percent,
-            'tax_percent': self.tax_percent,
-            'line_total': self.line_total,
-            'notes': self.notes
-        }
+        data = _serialize(self, OrderItem._dict_fields)
+        data['product_name'] = self.product.name if self.product else None
+        return data
+
+# Live subtotal aggregated in the database from the stored line totals, so
+# readers get it without loading the OrderItem rows. Deferred: it is only
+# selected when asked for, e.g. query(Order.subtotal_sql) or undefer().
+Order.subtotal_sql = column_property(
+    select(func.coalesce(func.sum(OrderItem.line_total), 0))
+    .where(OrderItem.order_id == Order.id)
+    .correlate_except(OrderItem)
+    .scalar_subquery(),
+    deferred=True
+)
 
 # ============================================================================
 # INVOICE & PAYMENT MANAGEMENT
@@ -596,65 +708,88 @@ class Invoice(db.Model):
     due_date = db.Column(db.Date, nullable=False)
 
     # Financial
-    subtotal = db.Column(db.Float, default=0)
-    tax_amount = db.Column(db.Float, default=0)
-    total_amount = db.Column(db.Float, default=0)
-    amount_paid = db.Column(db.Float, default=0)
+    subtotal = db.Column(_MONEY, default=0)
+    tax_amount = db.Column(_MONEY, default=0)
+    total_amount = db.Column(_MONEY, default=0)
+    amount_paid = db.Column(_MONEY, default=0)
     currency = db.Column(db.String(3), default='USD')
 
     # Status
     payment_status = db.Column(SQLEnum(PaymentStatus), default=PaymentStatus.PENDING)
 
+    # Outstanding amount, computed by the database so it can be filtered,
+    # sorted and summed in SQL
+    balance = column_property(total_amount - amount_paid)
+
     # Metadata
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    payments = db.relationship('Payment', backref='invoice', lazy='dynamic', cascade='all, delete-orphan')
+    payments = db.relationship('Payment', backref='invoice', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Keyset pagination of the invoices list, unfiltered and by status/company
+        db.Index('ix_invoices_created_id', 'created_at', 'id'),
+        db.Index('ix_invoices_status_created', 'payment_status', 'created_at'),
+        db.Index('ix_invoices_company_created', 'company_id', 'created_at'),
+        # Outstanding balances of unpaid invoices (dashboard/overdue reports)
+        db.Index(
+            'ix_invoices_open_balance', total_amount - amount_paid,
+            postgresql_where=payment_status != PaymentStatus.PAID,
+            sqlite_where=payment_status != PaymentStatus.PAID
+        ),
+    )
+
+    _dict_fields = _fields(
+        'id', 'invoice_number', 'company_id', 'order_id', ('invoice_date', _iso), ('due_date', _iso),
+        ('subtotal', _money), ('tax_amount', _money), ('total_amount', _money),
+        ('amount_paid', _money), ('balance', _money), 'currency',
+        ('payment_status', _enum_value), 'notes', ('created_at', _iso)
+    )
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'invoice_number': self.invoice_number,
-            'company_id': self.company_id,
-            'order_id': self.order_id,
-            'invoice_date': self.invoice_date.isoformat(),
-            'due_date': self.due_date.isoformat(),
-            'subtotal': self.subtotal,
-            'tax_amount': self.tax_amount,
-            'total_amount': self.total_amount,
-            'amount_paid': self.amount_paid,
-            'balance': self.total_amount - self.amount_paid,
-            'currency': self.currency,
-            'payment_status': self.payment_status.value,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Invoice._dict_fields)
+
+# Per-company order/invoice counts as correlated subqueries, loaded together
+# on first access or up front with undefer_group('relationship_counts')
+Company.orders_count = column_property(
+    select(func.count(Order.id))
+    .where(Order.company_id == Company.id)
+    .correlate_except(Order)
+    .scalar_subquery(),
+    deferred=True,
+    group='relationship_counts'
+)
+Company.invoices_count = column_property(
+    select(func.count(Invoice.id))
+    .where(Invoice.company_id == Company.id)
+    .correlate_except(Invoice)
+    .scalar_subquery(),
+    deferred=True,
+    group='relationship_counts'
+)
 
 class Payment(db.Model):
     __tablename__ = 'payments'
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False, index=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(_MONEY, nullable=False)
     payment_date = db.Column(db.Date, nullable=False)
     payment_method = db.Column(SQLEnum(PaymentMethod), nullable=False)
     reference_number = db.Column(db.String(100))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    _dict_fields = _fields(
+        'id', 'invoice_id', ('amount', _money), ('payment_date', _iso), ('payment_method', _enum_value),
+        'reference_number', 'notes', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'invoice_id': self.invoice_id,
-            'amount': self.amount,
-            'payment_date': self.payment_date.isoformat(),
-            'payment_method': self.payment_method.value,
-            'reference_number': self.reference_number,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Payment._dict_fields)
 
 # ============================================================================
 # SHIPPING & LOGISTICS
@@ -698,9 +833,9 @@ class Shipment(db.Model):
     number_of_packages = db.Column(db.Integer)
 
     # Costs
-    shipping_cost = db.Column(db.Float)
-    insurance_cost = db.Column(db.Float)
-    customs_value = db.Column(db.Float)
+    shipping_cost = db.Column(_MONEY)
+    insurance_cost = db.Column(_MONEY)
+    customs_value = db.Column(_MONEY)
 
     # Trade specific
     incoterm = db.Column(db.String(10))
@@ -711,48 +846,41 @@ class Shipment(db.Model):
 
     # Metadata
     notes = db.Column(db.Text)
-    tracking_events = db.Column(JSON)  # Store tracking history
+    tracking_events = db.Column(_JSONB, server_default='[]')  # Store tracking history
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     documents = db.relationship('Document', backref='shipment', lazy='dynamic')
 
+    __table_args__ = (
+        # Keyset pagination of the shipments list, unfiltered and by status/order
+        db.Index('ix_shipments_created_id', 'created_at', 'id'),
+        db.Index('ix_shipments_status_created', 'status', 'created_at'),
+        db.Index('ix_shipments_order_created', 'order_id', 'created_at'),
+        # Event lookups, e.g. tracking_events @> '[{"status": "delivered"}]'
+        _jsonb_index('ix_shipments_tracking_events_gin', 'tracking_events'),
+    )
+
+    _dict_fields = _fields(
+        'id', 'tracking_number', 'order_id', 'company_id', ('status', _enum_value),
+        'carrier', 'service_type',
+        ('ship_date', _iso), ('estimated_delivery_date', _iso), ('actual_delivery_date', _iso),
+        ('origin', _fields(
+            ('address', 'origin_address_line1'), ('city', 'origin_city'),
+            ('state', 'origin_state'), ('country', 'origin_country')
+        )),
+        ('destination', _fields(
+            ('line1', 'destination_address_line1'), ('line2', 'destination_address_line2'),
+            ('city', 'destination_city'), ('state', 'destination_state'),
+            ('postal_code', 'destination_postal_code'), ('country', 'destination_country')
+        )),
+        'total_weight', 'weight_unit', 'number_of_packages', ('shipping_cost', _money),
+        'incoterm', 'container_number', 'tracking_events', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'tracking_number': self.tracking_number,
-            'order_id': self.order_id,
-            'company_id': self.company_id,
-            'status': self.status.value,
-            'carrier': self.carrier,
-            'service_type': self.service_type,
-            'ship_date': self.ship_date.isoformat() if self.ship_date else None,
-            'estimated_delivery_date': self.estimated_delivery_date.isoformat() if self.estimated_delivery_date else None,
-            'actual_delivery_date': self.actual_delivery_date.isoformat() if self.actual_delivery_date else None,
-            'origin': {
-                'address': self.origin_address_line1,
-                'city': self.origin_city,
-                'state': self.origin_state,
-                'country': self.origin_country
-            },
-            'destination': {
-                'line1': self.destination_address_line1,
-                'line2': self.destination_address_line2,
-                'city': self.destination_city,
-                'state': self.destination_state,
-                'postal_code': self.destination_postal_code,
-                'country': self.destination_country
-            },
-            'total_weight': self.total_weight,
-            'weight_unit': self.weight_unit,
-            'number_of_packages': self.number_of_packages,
-            'shipping_cost': self.shipping_cost,
-            'incoterm': self.incoterm,
-            'container_number': self.container_number,
-            'tracking_events': self.tracking_events,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Shipment._dict_fields)
 
 # ============================================================================
 # DOCUMENT MANAGEMENT
@@ -781,7 +909,7 @@ class Document(db.Model):
 
     # Metadata
     description = db.Column(db.Text)
-    tags = db.Column(JSON)
+    tags = db.Column(_JSONB)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -789,25 +917,14 @@ class Document(db.Model):
     uploaded_by_user = db.relationship('User', backref='uploaded_documents', foreign_keys=[uploaded_by])
     parent_document = db.relationship('Document', remote_side=[id], backref='versions')
 
+    _dict_fields = _fields(
+        'id', ('document_type', _enum_value), 'title', 'file_name', 'file_path', 'file_size', 'mime_type',
+        'company_id', 'order_id', 'shipment_id', 'invoice_id', 'version',
+        'description', 'tags', 'uploaded_by', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'document_type': self.document_type.value,
-            'title': self.title,
-            'file_name': self.file_name,
-            'file_path': self.file_path,
-            'file_size': self.file_size,
-            'mime_type': self.mime_type,
-            'company_id': self.company_id,
-            'order_id': self.order_id,
-            'shipment_id': self.shipment_id,
-            'invoice_id': self.invoice_id,
-            'version': self.version,
-            'description': self.description,
-            'tags': self.tags,
-            'uploaded_by': self.uploaded_by,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Document._dict_fields)
 
 # ============================================================================
 # ACTIVITY TRACKING
@@ -833,19 +950,14 @@ class Activity(db.Model):
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    _dict_fields = _fields(
+        'id', ('activity_type', _enum_value), 'subject', 'description',
+        'user_id', 'company_id', 'contact_id',
+        ('activity_date', _iso), 'duration_minutes', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'activity_type': self.activity_type.value,
-            'subject': self.subject,
-            'description': self.description,
-            'user_id': self.user_id,
-            'company_id': self.company_id,
-            'contact_id': self.contact_id,
-            'activity_date': self.activity_date.isoformat(),
-            'duration_minutes': self.duration_minutes,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Activity._dict_fields)
 
 # ============================================================================
 # TASK MANAGEMENT
@@ -881,22 +993,14 @@ class Task(db.Model):
     related_company = db.relationship('Company', backref='tasks')
     related_order = db.relationship('Order', backref='tasks')
 
+    _dict_fields = _fields(
+        'id', 'title', 'description', 'status', 'priority', 'assigned_to', 'created_by',
+        'company_id', 'order_id', ('due_date', _iso), ('completed_at', _iso),
+        ('created_at', _iso), ('updated_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'status': self.status,
-            'priority': self.priority,
-            'assigned_to': self.assigned_to,
-            'created_by': self.created_by,
-            'company_id': self.company_id,
-            'order_id': self.order_id,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        return _serialize(self, Task._dict_fields)
 
 # ============================================================================
 # NOTIFICATIONS
@@ -914,17 +1018,12 @@ class Notification(db.Model):
     link = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    _dict_fields = _fields(
+        'id', 'user_id', 'title', 'message', 'notification_type', 'is_read', 'link', ('created_at', _iso)
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'title': self.title,
-            'message': self.message,
-            'notification_type': self.notification_type,
-            'is_read': self.is_read,
-            'link': self.link,
-            'created_at': self.created_at.isoformat()
-        }
+        return _serialize(self, Notification._dict_fields)
 
 # ============================================================================
 # EXCHANGE RATES (for multi-currency support)
@@ -944,11 +1043,7 @@ class ExchangeRate(db.Model):
         db.UniqueConstraint('from_currency', 'to_currency', 'date', name='uix_currencies_date'),
     )
 
+    _dict_fields = _fields('id', 'from_currency', 'to_currency', 'rate', ('date', _iso))
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'from_currency': self.from_currency,
-            'to_currency': self.to_currency,
-            'rate': self.rate,
-            'date': self.date.isoformat()
-        }
+        return _serialize(self, ExchangeRate._dict_fields)
@@ -7,43 +7,39 @@ import json
 from pathlib import Path
 
 from agent import fill_form
-from data_collection.classifier import classify_hs
+from data_collection.classifier import classify_hs, load_hs_index, save_hs_index
 from data_collection.data_loader import load_hts_data
 from embedding_generator import generate_embeddings
-import pickle
-import os
 
 
 class TradeAgent:
     """Agent for automated trade form filling with HS code classification."""
 
-    def __init__(self, hs_data_cache_path: str = "hs_data_cache.pkl"):
+    def __init__(self, hs_index_dir: str = "hs_index"):
         """Initialize the trade agent.
 
         Args:
-            hs_data_cache_path: Path to cache file for HS data embeddings
+            hs_index_dir: Directory holding the precomputed HS embedding index
         """
-        self.hs_data_cache_path = hs_data_cache_path
+        self.hs_index_dir = hs_index_dir
         self.hs_entries = None
         self._load_hs_data()
 
     def _load_hs_data(self):
         """Load or generate HS code data with embeddings."""
-        if os.path.exists(self.hs_data_cache_path):
-            print(f"Loading cached HS data from {self.hs_data_cache_path}...")
-            with open(self.hs_data_cache_path, 'rb') as f:
-                self.hs_entries = pickle.load(f)
-            print(f"Loaded {len(self.hs_entries)} HS entries from cache.")
+        hs_entries = load_hs_index(self.hs_index_dir)
+        if hs_entries is not None:
+            self.hs_entries = hs_entries
+            print(f"Loaded {len(self.hs_entries)} HS entries from {self.hs_index_dir}.")
         else:
-            print("Cache not found. Loading and generating HS data...")
+            print("HS index not found. Loading and generating HS data...")
             try:
                 self.hs_entries = load_hts_data()
                 self.hs_entries = generate_embeddings(self.hs_entries)
 
-                # Cache the data for future use
-                with open(self.hs_data_cache_path, 'wb') as f:
-                    pickle.dump(self.hs_entries, f)
-                print(f"HS data cached to {self.hs_data_cache_path}")
+                # Persist the normalized embedding matrix for future startups
+                save_hs_index(self.hs_entries, self.hs_index_dir)
+                print(f"HS index saved to {self.hs_index_dir}")
             except FileNotFoundError:
                 print("Warning: HTS data file not found. HS code classification will be unavailable.")
                 self.hs_entries = []